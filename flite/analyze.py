@@ -0,0 +1,382 @@
+"""
+Index advisor for Flite projects
+"""
+
+import json
+import os
+import re
+import subprocess
+import tempfile
+import uuid
+from datetime import datetime
+
+# Runs inside the project's interpreter. Creates the app on a scratch
+# database (seeded with synthetic rows), requests every GET route through
+# the test client, and records the SELECT statements they send. Candidate
+# indexes come from the columns those statements filter, join and sort on;
+# each one is created, the statements are re-planned and timed, and the
+# index is dropped again.
+ANALYZE_SCRIPT = '''
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.getcwd())
+
+from flask import url_for
+from sqlalchemy import Table, event, inspect, text
+from sqlalchemy import types as sqltypes
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, UnaryExpression
+from sqlalchemy.sql.selectable import Join, Select
+
+database_url, rows, result_path = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+extra_paths = sys.argv[4:]
+
+import config as project_config
+
+class AnalyzeConfig(project_config.Config):
+    SQLALCHEMY_DATABASE_URI = database_url
+    TESTING = False
+    # Every request should reach the database
+    RESPONSE_CACHE_ENABLED = False
+    QUERY_CACHE_ENABLED = False
+    FRAGMENT_CACHE_ENABLED = False
+    CACHE_BACKEND = 'memory'
+    METRICS_ENABLED = False
+    SLOW_QUERY_MS = None
+    QUERY_BUDGET_ENABLED = False
+
+from app import create_app
+
+app = create_app(AnalyzeConfig)
+db = app.extensions.get('sqlalchemy')
+if db is None:
+    raise SystemExit('The project has no database')
+
+EQUALITY = {operators.eq, operators.in_op, operators.is_}
+RANGE = {operators.lt, operators.le, operators.gt, operators.ge, operators.between_op}
+
+def fake_value(column, i, parents):
+    """A value for row i that varies like real data would"""
+    if column.foreign_keys:
+        target = next(iter(column.foreign_keys)).column
+        return (i % max(parents.get(target.table.name, 1), 1)) + 1
+    kind = column.type
+    if isinstance(kind, sqltypes.Boolean):
+        return i % 2 == 0
+    if isinstance(kind, sqltypes.Integer):
+        return i
+    if isinstance(kind, sqltypes.Numeric):
+        return i / 10
+    if isinstance(kind, sqltypes.DateTime):
+        return datetime(2024, 1, 1) + timedelta(minutes=i)
+    if isinstance(kind, sqltypes.Date):
+        return date(2024, 1, 1) + timedelta(days=i % 3650)
+    if isinstance(kind, sqltypes.Enum):
+        return kind.enums[i % len(kind.enums)]
+    if isinstance(kind, sqltypes.LargeBinary):
+        return str(i).encode()
+    if isinstance(kind, sqltypes.JSON):
+        return {'n': i}
+    if isinstance(kind, sqltypes.String):
+        value = f'{column.name}-{i}'
+        length = getattr(kind, 'length', None)
+        return value if not length or len(value) <= length else str(i)[-length:]
+    return None if column.nullable else str(i)
+
+def seed(connection):
+    """Fill empty tables, parents first"""
+    parents = {}
+    for table in db.metadata.sorted_tables:
+        existing = connection.execute(text(f'SELECT COUNT(*) FROM {table.name}')).scalar()
+        if existing:
+            parents[table.name] = existing
+            continue
+        columns = [
+            column for column in table.columns
+            if not (column.primary_key and column.autoincrement in (True, 'auto') and isinstance(column.type, sqltypes.Integer))
+        ]
+        batch = [{column.name: fake_value(column, i, parents) for column in columns} for i in range(1, rows + 1)]
+        connection.execute(table.insert(), batch)
+        parents[table.name] = rows
+
+def table_column(element):
+    element = getattr(element, 'element', element) if isinstance(element, UnaryExpression) else element
+    table = getattr(element, 'table', None)
+    if isinstance(table, Table) and getattr(element, 'name', None) in table.columns:
+        return table.name, element.name
+    return None
+
+def usage(select):
+    """{table: (equality columns, range columns, order by columns)}"""
+    found = {}
+    def note(table, column, kind):
+        columns = found.setdefault(table, ([], [], []))[kind]
+        if column not in columns:
+            columns.append(column)
+
+    clauses = [select.whereclause] if select.whereclause is not None else []
+    for source in select.get_final_froms():
+        for element in visitors.iterate(source):
+            if isinstance(element, Join):
+                clauses.append(element.onclause)
+    for clause in clauses:
+        for element in visitors.iterate(clause):
+            if not isinstance(element, BinaryExpression):
+                continue
+            for side, other in ((element.left, element.right), (element.right, element.left)):
+                column = table_column(side)
+                if column is None:
+                    continue
+                # A join condition is only useful on the side being looked up
+                if element.operator in EQUALITY:
+                    note(*column, 0)
+                elif element.operator in RANGE and table_column(other) is None:
+                    note(*column, 1)
+    for clause in select._order_by_clauses:
+        column = table_column(clause)
+        if column is not None:
+            note(*column, 2)
+    return found
+
+def candidate(equality, ranged, ordered):
+    """Equality columns first, then one range column or the sort columns"""
+    columns = list(equality)
+    extra = ranged[:1] if ranged else ordered
+    columns += [column for column in extra if column not in columns]
+    return tuple(columns)
+
+def existing_indexes(inspector, table):
+    indexes = [tuple(inspector.get_pk_constraint(table)['constrained_columns'])]
+    indexes += [tuple(index['column_names']) for index in inspector.get_indexes(table)]
+    indexes += [tuple(unique['column_names']) for unique in inspector.get_unique_constraints(table)]
+    return [index for index in indexes if index]
+
+statements = {}
+current_route = [None]
+
+def capture(conn, cursor, statement, parameters, context, executemany):
+    compiled = getattr(context, 'compiled', None)
+    if executemany or compiled is None or not isinstance(compiled.statement, Select):
+        return
+    entry = statements.setdefault(statement, {'sql': statement, 'parameters': parameters, 'routes': [], 'usage': usage(compiled.statement)})
+    if current_route[0] not in entry['routes']:
+        entry['routes'].append(current_route[0])
+
+with app.app_context():
+    engine = db.engine
+    dialect = engine.dialect.name
+    db.create_all()
+    with engine.begin() as connection:
+        seed(connection)
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    paths = []
+    for rule in app.url_map.iter_rules():
+        if 'GET' not in rule.methods or rule.endpoint == 'static':
+            continue
+        # Seeded ids start at 1, and 1 is a valid value for most converters
+        with app.test_request_context():
+            paths.append(url_for(rule.endpoint, **{name: 1 for name in rule.arguments}))
+    paths += extra_paths
+
+    visited = []
+    client = app.test_client()
+    for path in paths:
+        current_route[0] = f'GET {path}'
+        try:
+            status = client.get(path).status_code
+        except Exception as e:
+            status = f'{type(e).__name__}: {e}'
+        visited.append({'path': path, 'status': status})
+    event.remove(engine, 'before_cursor_execute', capture)
+
+    def plan(connection, sql, parameters):
+        if dialect == 'sqlite':
+            rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parameters).all()
+            return [row[-1] for row in rows]
+        return [' | '.join(str(value) for value in row) for row in connection.exec_driver_sql('EXPLAIN ' + sql, parameters).all()]
+
+    def cost(connection, sql, parameters):
+        if dialect == 'postgresql':
+            document = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql, parameters).scalar()
+            document = json.loads(document) if isinstance(document, str) else document
+            return float(document[0]['Plan']['Total Cost'])
+        if dialect == 'mysql':
+            document = json.loads(connection.exec_driver_sql('EXPLAIN FORMAT=JSON ' + sql, parameters).scalar())
+            return float(document['query_block']['cost_info']['query_cost'])
+        # SQLite has no cost estimate, time the statement instead
+        timings = []
+        for _ in range(7):
+            start = time.perf_counter()
+            connection.exec_driver_sql(sql, parameters).all()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    inspector = inspect(engine)
+    candidates = {}
+    for entry in statements.values():
+        for table, (equality, ranged, ordered) in entry['usage'].items():
+            columns = candidate(equality, ranged, ordered)
+            if not columns:
+                continue
+            if any(index[:len(columns)] == columns for index in existing_indexes(inspector, table)):
+                continue
+            candidates.setdefault((table, columns), []).append(entry)
+
+    suggestions = []
+    with engine.connect() as connection:
+        for (table, columns), entries in sorted(candidates.items()):
+            name = f'ix_{table}_{"_".join(columns)}'
+            measured = [{
+                'sql': entry['sql'],
+                'routes': entry['routes'],
+                'before': cost(connection, entry['sql'], entry['parameters']),
+                'plan_before': plan(connection, entry['sql'], entry['parameters'])
+            } for entry in entries]
+            connection.exec_driver_sql(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})')
+            connection.commit()
+            try:
+                for statement, entry in zip(measured, entries):
+                    statement['after'] = cost(connection, entry['sql'], entry['parameters'])
+                    statement['plan_after'] = plan(connection, entry['sql'], entry['parameters'])
+            finally:
+                connection.rollback()
+                drop = f'DROP INDEX {name} ON {table}' if dialect == 'mysql' else f'DROP INDEX {name}'
+                connection.exec_driver_sql(drop)
+                connection.commit()
+            suggestions.append({
+                'table': table,
+                'columns': list(columns),
+                'name': name,
+                'before': sum(statement['before'] for statement in measured),
+                'after': sum(statement['after'] for statement in measured),
+                'statements': measured
+            })
+
+with open(result_path, 'w', encoding='utf-8') as f:
+    json.dump({
+        'database': dialect,
+        'unit': 'ms' if dialect == 'sqlite' else 'cost',
+        'rows': rows,
+        'routes': visited,
+        'statements': len(statements),
+        'suggestions': suggestions
+    }, f, default=str)
+'''
+
+# An index has to cut the cost of its statements by this much to be worth
+# its write overhead
+MIN_IMPROVEMENT = 0.1
+
+def analyze_indexes(python_cmd, database_url=None, rows=2000, paths=()):
+    """Collect the project's SELECT statements and try indexes for them
+
+    Without database_url the app runs on a scratch SQLite file. Returns the
+    report of the project's interpreter, suggestions split into 'suggested'
+    and 'rejected', or raises RuntimeError when the app could not run.
+    """
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    scratch = None
+    if database_url is None:
+        fd, scratch = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        database_url = f'sqlite:///{scratch}'
+    try:
+        result = subprocess.run(
+            [python_cmd, '-c', ANALYZE_SCRIPT, database_url, str(rows), result_path] + list(paths),
+            capture_output=True, text=True, shell=False
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error')
+        with open(result_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    finally:
+        os.remove(result_path)
+        if scratch is not None:
+            os.remove(scratch)
+
+    report['suggested'] = [s for s in report['suggestions'] if s['after'] < s['before'] * (1 - MIN_IMPROVEMENT)]
+    report['rejected'] = [s for s in report['suggestions'] if s not in report['suggested']]
+    return report
+
+_REVISION = re.compile(r"^(down_revision|revision)\s*=\s*(.+)$", re.MULTILINE)
+
+def alembic_head(versions_dir):
+    """The single head revision of a versions folder, None when it is empty
+
+    Raises RuntimeError when the history has several heads.
+    """
+    revisions, parents = set(), set()
+    for name in os.listdir(versions_dir):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(versions_dir, name), 'r', encoding='utf-8') as f:
+            found = dict(_REVISION.findall(f.read()))
+        if 'revision' not in found:
+            continue
+        revisions.add(found['revision'].strip().strip('\'"'))
+        down = found.get('down_revision', 'None').strip()
+        # A merge revision lists its parents as a tuple
+        parents.update(re.findall(r"['\"]([^'\"]+)['\"]", down))
+    heads = revisions - parents
+    if len(heads) > 1:
+        raise RuntimeError(f"several Alembic heads ({', '.join(sorted(heads))}), merge them first")
+    return heads.pop() if heads else None
+
+MIGRATION_TEMPLATE = '''"""Add indexes suggested by flite db analyze
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {created}
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '{revision}'
+down_revision = {down_revision_literal}
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+{upgrade}
+
+
+def downgrade():
+{downgrade}
+'''
+
+def write_index_migration(suggestions, directory='migrations'):
+    """Write an Alembic revision creating the suggested indexes, return its path"""
+    versions_dir = os.path.join(directory, 'versions')
+    if not os.path.isdir(versions_dir):
+        raise RuntimeError(f"{versions_dir} not found, run 'flask db init' first")
+    down_revision = alembic_head(versions_dir)
+    revision = uuid.uuid4().hex[:12]
+    upgrade = [
+        f"    op.create_index('{s['name']}', '{s['table']}', {s['columns']!r}, unique=False)"
+        for s in suggestions
+    ]
+    downgrade = [
+        f"    op.drop_index('{s['name']}', table_name='{s['table']}')"
+        for s in reversed(suggestions)
+    ]
+    path = os.path.join(versions_dir, f'{revision}_add_suggested_indexes.py')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(MIGRATION_TEMPLATE.format(
+            revision=revision,
+            down_revision=down_revision,
+            down_revision_literal=repr(down_revision),
+            created=datetime.now().isoformat(sep=' '),
+            upgrade='\n'.join(upgrade) or '    pass',
+            downgrade='\n'.join(downgrade) or '    pass'
+        ))
+    return path
@@ -0,0 +1,414 @@
+"""
+HTTP load generation for Flite projects
+"""
+
+import asyncio
+import itertools
+import json
+import math
+import os
+import socket
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_FIXTURES = 'bench.json'
+
+# Runs inside the project's interpreter: lists the URL rules of the app,
+# with a path built by url_for with 1 for every argument, as analyze does.
+ROUTES_SCRIPT = '''
+import json
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from flask import url_for
+from app import create_app
+
+app = create_app()
+routes = []
+for rule in app.url_map.iter_rules():
+    if rule.endpoint == 'static':
+        continue
+    try:
+        with app.test_request_context():
+            path = url_for(rule.endpoint, **{name: 1 for name in rule.arguments})
+    except Exception:
+        # A converter 1 doesn't satisfy, the fixtures have to give a path
+        path = None
+    routes.append({
+        'rule': rule.rule,
+        'methods': sorted(rule.methods - {'HEAD', 'OPTIONS'}),
+        'path': path
+    })
+
+with open(sys.argv[1], 'w', encoding='utf-8') as f:
+    json.dump(routes, f)
+'''
+
+def discover_routes(python_cmd):
+    """The app's URL rules, as [{'rule', 'methods', 'path'}]"""
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        result = subprocess.run([python_cmd, '-c', ROUTES_SCRIPT, result_path], capture_output=True, text=True, shell=False)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error')
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+def run_microbenchmarks(python_cmd, iterations=200, warmup=20, memory=True, prefixes=()):
+    """Run the project's benchmarks/ suite, returns its report
+
+    The suite prints its own table to the terminal.
+    """
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    command = [python_cmd, '-m', 'benchmarks', '--iterations', str(iterations), '--warmup', str(warmup), '--json', result_path]
+    if not memory:
+        command.append('--no-memory')
+    for prefix in prefixes:
+        command += ['--route', prefix]
+    try:
+        result = subprocess.run(command, stderr=subprocess.PIPE, text=True, shell=False)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error')
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+def load_fixtures(path):
+    """Request fixtures keyed by 'METHOD /rule', each a dict or a list of them"""
+    with open(path, 'r', encoding='utf-8') as f:
+        fixtures = json.load(f)
+    if not isinstance(fixtures, dict):
+        raise ValueError(f'{path} must hold an object keyed by "METHOD /rule"')
+    return {key: value if isinstance(value, list) else [value] for key, value in fixtures.items()}
+
+class Target:
+    """One route to load, cycling through its request variants"""
+
+    def __init__(self, method, rule, requests):
+        self.method = method
+        self.rule = rule
+        self.label = f'{method} {rule}'
+        # (path, headers, body) per variant
+        self.requests = requests
+        self._variants = itertools.cycle(requests)
+
+    def next_request(self):
+        return next(self._variants)
+
+def build_targets(routes, fixtures=None, prefixes=()):
+    """The targets to load and the routes skipped, with why
+
+    GET routes are loaded as discovered. Other methods change data and are
+    only loaded when the fixtures have an entry for them, which also gives
+    the request body. A fixture entry can set 'path', 'json' or 'body',
+    and 'headers'.
+    """
+    fixtures = dict(fixtures or {})
+    targets, skipped = [], []
+    for route in routes:
+        if prefixes and not any(route['rule'].startswith(prefix) for prefix in prefixes):
+            continue
+        for method in route['methods']:
+            label = f"{method} {route['rule']}"
+            variants = fixtures.pop(label, None)
+            if variants is None:
+                if method != 'GET':
+                    skipped.append((label, 'no fixture'))
+                    continue
+                variants = [{}]
+
+            requests = []
+            for variant in variants:
+                path = variant.get('path', route['path'])
+                if path is None:
+                    break
+                headers = dict(variant.get('headers', {}))
+                body = b''
+                if 'json' in variant:
+                    body = json.dumps(variant['json']).encode('utf-8')
+                    headers.setdefault('Content-Type', 'application/json')
+                elif 'body' in variant:
+                    body = variant['body'].encode('utf-8')
+                requests.append((path, headers, body))
+            if len(requests) != len(variants):
+                skipped.append((label, 'no path for its arguments, set one in the fixtures'))
+                continue
+            targets.append(Target(method, route['rule'], requests))
+    for label in fixtures:
+        skipped.append((label, 'fixture matches no route'))
+    return targets, skipped
+
+class HTTPConnection:
+    """A keep-alive HTTP/1.1 connection on asyncio streams"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method, path, headers, body):
+        """Send a request and read the whole response, returns (status, body size)"""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('connection closed by the server')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        status = int(status)
+        connection = response_headers.get('connection', '').lower()
+        keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            size = 0
+        elif 'chunked' in response_headers.get('transfer-encoding', '').lower():
+            size = await self._read_chunked()
+        elif 'content-length' in response_headers:
+            size = int(response_headers['content-length'])
+            await self.reader.readexactly(size)
+        else:
+            # Delimited by the end of the connection
+            size = len(await self.reader.read())
+            keep_alive = False
+        if not keep_alive:
+            self.close()
+        return status, size
+
+    async def _read_chunked(self):
+        size = 0
+        while True:
+            length = int((await self.reader.readline()).split(b';', 1)[0], 16)
+            if length == 0:
+                # Trailers up to the blank line
+                while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return size
+            await self.reader.readexactly(length + 2)
+            size += length
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return None
+    index = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+class RouteStats:
+    """Latencies and outcomes of one target's measured requests"""
+
+    def __init__(self, label):
+        self.label = label
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+        self.bytes = 0
+
+    def add(self, latency, status=None, size=0, error=None):
+        self.latencies.append(latency)
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+        else:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.bytes += size
+
+    def sample(self, limit=2000):
+        """Up to limit latencies in ms, evenly spread over the run"""
+        step = max(len(self.latencies) // limit, 1) if limit else 1
+        return [round(latency * 1000, 3) for latency in self.latencies[::step][:limit or None]]
+
+    def summary(self, duration):
+        latencies = sorted(self.latencies)
+        requests = len(latencies)
+        failed = sum(self.errors.values()) + sum(count for status, count in self.statuses.items() if status >= 400)
+        return {
+            'route': self.label,
+            'requests': requests,
+            'rps': requests / duration if duration else 0.0,
+            'errors': failed,
+            'error_rate': failed / requests if requests else 0.0,
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'exceptions': dict(self.errors),
+            'bytes': self.bytes,
+            'mean_ms': sum(latencies) / requests * 1000 if requests else None,
+            'p50_ms': _ms(percentile(latencies, 0.50)),
+            'p90_ms': _ms(percentile(latencies, 0.90)),
+            'p99_ms': _ms(percentile(latencies, 0.99)),
+            'max_ms': _ms(latencies[-1] if latencies else None)
+        }
+
+def _ms(seconds):
+    return seconds * 1000 if seconds is not None else None
+
+async def _load(host, port, targets, concurrency, rate, warmup, duration, timeout):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    measure_from = start + warmup
+    end = measure_from + duration
+    order = itertools.cycle(targets)
+    stats = {target.label: RouteStats(target.label) for target in targets}
+    total = RouteStats('total')
+    sent = itertools.count()
+    # Requests completed in each whole measured second
+    per_second = [0] * max(int(duration), 1)
+
+    async def worker():
+        connection = HTTPConnection(host, port)
+        try:
+            while True:
+                if rate:
+                    # Open loop: requests go out on a fixed schedule, and the
+                    # latency counts from when a request was due, so a stalled
+                    # server isn't hidden by workers waiting on it
+                    scheduled = start + next(sent) / rate
+                    delay = scheduled - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    scheduled = loop.time()
+                if scheduled >= end:
+                    return
+                target = next(order)
+                path, headers, body = target.next_request()
+                status, size, error = None, 0, None
+                try:
+                    status, size = await asyncio.wait_for(connection.request(target.method, path, headers, body), timeout)
+                except asyncio.TimeoutError:
+                    error = 'timeout'
+                    connection.close()
+                except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                    error = type(e).__name__
+                    connection.close()
+                if scheduled >= measure_from:
+                    latency = loop.time() - scheduled
+                    stats[target.label].add(latency, status, size, error)
+                    total.add(latency, status, size, error)
+                    second = int(loop.time() - measure_from)
+                    if second < len(per_second):
+                        per_second[second] += 1
+        finally:
+            connection.close()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    # Requests in flight at the end finish late, count the time they took
+    measured = max(loop.time(), end) - measure_from
+    return [stats[target.label] for target in targets], total, measured, per_second
+
+def run_load(url, targets, concurrency=10, rate=0.0, warmup=2.0, duration=10.0, timeout=5.0):
+    """Drive the targets against a server and summarize per route
+
+    Without a rate each of the concurrency workers sends its next request
+    as soon as the last one is answered. With a rate, in requests per
+    second over all workers, requests are sent on schedule and queue when
+    every worker is busy. Requests sent during the warm-up aren't counted.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != 'http' or parts.path.strip('/'):
+        raise ValueError('expected a server root like http://127.0.0.1:5000')
+    try:
+        socket.create_connection((parts.hostname, parts.port or 80), timeout=timeout).close()
+    except OSError as e:
+        raise ConnectionError(f'nothing answers at {url}: {e}') from e
+
+    routes, total, measured, per_second = asyncio.run(
+        _load(parts.hostname, parts.port or 80, targets, concurrency, rate, warmup, duration, timeout)
+    )
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'rate': rate,
+        'warmup': warmup,
+        'duration': measured,
+        'routes': [route.summary(measured) for route in routes],
+        'total': total.summary(measured),
+        'per_second': per_second,
+        'samples': {route.label: route.sample() for route in routes + [total]}
+    }
+
+def free_port(host='127.0.0.1'):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+def server_command(python_cmd, server, host, port, workers=2):
+    """The command serving the project for a benchmark"""
+    if server == 'gunicorn':
+        return [python_cmd, '-m', 'gunicorn', '--bind', f'{host}:{port}', '--workers', str(workers), 'wsgi:app']
+    return [python_cmd, 'run.py', '--host', host, '--port', str(port)]
+
+class BenchServer:
+    """The project served in a child process for the length of a benchmark"""
+
+    def __init__(self, command, host, port, startup_timeout=30.0):
+        self.command = command
+        self.host = host
+        self.port = port
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self._log = None
+
+    @property
+    def url(self):
+        return f'http://{self.host}:{self.port}'
+
+    def __enter__(self):
+        # The server logs every request, keep it out of the report
+        self._log = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+        self.process = subprocess.Popen(self.command, stdout=self._log, stderr=subprocess.STDOUT, shell=False)
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            if self.process.poll() is not None:
+                error = self._last_line() or f'exited with status {self.process.returncode}'
+                self._stop()
+                raise RuntimeError(error)
+            try:
+                socket.create_connection((self.host, self.port), timeout=0.5).close()
+                return self
+            except OSError:
+                if time.monotonic() > deadline:
+                    self._stop()
+                    raise RuntimeError(f'not listening on {self.host}:{self.port} after {self.startup_timeout:.0f}s')
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        self._stop()
+
+    def _last_line(self):
+        self._log.seek(0)
+        lines = [line for line in self._log.read().splitlines() if line.strip()]
+        return lines[-1].strip() if lines else None
+
+    def _stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self._log.close()
@@ -0,0 +1,150 @@
+"""
+Production build steps for Flite projects
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+# Runs inside the project's own interpreter, so it sees the project's
+# Flask, Jinja and extensions. Loads every template through a copy of the
+# app's Jinja environment with a bytecode cache attached, then times cold
+# loads and first renders without and with that cache.
+TEMPLATE_PRECOMPILE_SCRIPT = '''
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from jinja2 import FileSystemBytecodeCache
+from app import create_app
+
+default_target, result_path, repeat = sys.argv[1], sys.argv[2], int(sys.argv[3])
+app = create_app()
+target = app.config.get('TEMPLATE_CACHE_DIR') or default_target
+os.makedirs(target, exist_ok=True)
+bytecode_cache = FileSystemBytecodeCache(target)
+bytecode_cache.clear()
+
+names = sorted(app.jinja_env.list_templates())
+errors = {}
+env = app.jinja_env.overlay(cache_size=0, bytecode_cache=bytecode_cache, auto_reload=False)
+for name in names:
+    try:
+        env.get_template(name)
+    except Exception as e:
+        errors[name] = f'{type(e).__name__}: {e}'
+names = [name for name in names if name not in errors]
+
+def cold_start(cache):
+    """Load and render every template once, in a fresh environment"""
+    env = app.jinja_env.overlay(cache_size=0, bytecode_cache=cache, auto_reload=False)
+    load = render = 0.0
+    with app.test_request_context('/'):
+        for name in names:
+            start = time.perf_counter()
+            template = env.get_template(name)
+            loaded = time.perf_counter()
+            try:
+                template.render()
+            except Exception:
+                # Needs context the build can't provide, count the load only
+                loaded = time.perf_counter()
+            load += loaded - start
+            render += time.perf_counter() - start
+    return load, render
+
+# Best of several runs, each from a cold environment
+before = min((cold_start(None) for _ in range(repeat)), key=lambda run: run[1])
+after = min((cold_start(bytecode_cache) for _ in range(repeat)), key=lambda run: run[1])
+
+with open(result_path, 'w', encoding='utf-8') as f:
+    json.dump({
+        'target': os.path.relpath(target),
+        'configured': bool(app.config.get('TEMPLATE_CACHE_DIR')),
+        'templates': names,
+        'errors': errors,
+        'load_before': before[0],
+        'load_after': after[0],
+        'render_before': before[1],
+        'render_after': after[1]
+    }, f)
+'''
+
+def precompile_templates(python_cmd, target=os.path.join('build', 'templates'), repeat=5):
+    """Compile the project's templates into a Jinja bytecode cache
+
+    Returns the timings reported by the project's interpreter, or raises
+    RuntimeError when the app could not be imported.
+    """
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        result = subprocess.run(
+            [python_cmd, '-c', TEMPLATE_PRECOMPILE_SCRIPT, target, result_path, str(repeat)],
+            capture_output=True, text=True, shell=False
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error')
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+# Top-level entries of a project that are not its source
+COMPILE_SKIP = {'build', 'instance', 'node_modules', 'venv', '__pycache__'}
+
+# Runs inside the project's interpreter, compiles at level 0 for normal runs
+# and level 1 for python -O / PYTHONOPTIMIZE=1. Both levels in one pass need
+# Python 3.9, older interpreters get a pass per level. Exits 1 when a file
+# fails, its error is the last line printed.
+COMPILE_SCRIPT = '''
+import compileall
+import os
+import sys
+
+levels = [[0, 1]] if sys.version_info >= (3, 9) else [0, 1]
+ok = True
+for optimize in levels:
+    for target in sys.argv[1:]:
+        if os.path.isdir(target):
+            ok = compileall.compile_dir(target, quiet=1, workers=0, optimize=optimize) and ok
+        else:
+            ok = compileall.compile_file(target, quiet=1, optimize=optimize) and ok
+sys.exit(0 if ok else 1)
+'''
+
+def _compileall(python_cmd, targets):
+    return subprocess.run(
+        [python_cmd, '-c', COMPILE_SCRIPT] + targets,
+        capture_output=True, text=True, shell=False
+    )
+
+def byte_compile(python_cmd, venv_dir=None):
+    """Byte-compile the project, and its virtualenv when given
+
+    Returns the seconds spent on each, and whether any virtualenv file
+    failed to compile. Raises RuntimeError when a project file fails.
+    """
+    targets = sorted(
+        name for name in os.listdir('.')
+        if not name.startswith('.') and name not in COMPILE_SKIP
+        and (os.path.isdir(name) or name.endswith('.py'))
+    )
+    start = time.perf_counter()
+    result = _compileall(python_cmd, targets)
+    if result.returncode != 0:
+        errors = [line for line in result.stdout.splitlines() if line.strip()]
+        raise RuntimeError(errors[-1] if errors else 'compileall failed')
+    report = {'project': time.perf_counter() - start, 'venv': None, 'venv_errors': False}
+
+    if venv_dir is not None:
+        start = time.perf_counter()
+        # Packages sometimes ship files that are not meant to compile
+        report['venv_errors'] = _compileall(python_cmd, [venv_dir]).returncode != 0
+        report['venv'] = time.perf_counter() - start
+    return report
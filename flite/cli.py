@@ -4,12 +4,30 @@ Flite CLI - Main command line interface
 """
 
 import click
+import json
 import os
+import sqlite3
 import sys
 import subprocess
+from contextlib import closing
+from datetime import datetime
 from pathlib import Path
 from .generator import ProjectGenerator
-from .utils import print_success, print_error, print_info, print_warning
+from .utils import print_success, print_error, print_info, print_warning, get_venv_python
+from .build import precompile_templates, byte_compile
+from .startup import startup_report as run_startup_report, slowest_imports
+from .analyze import analyze_indexes, write_index_migration
+from .bench import (
+    DEFAULT_FIXTURES, BenchServer, build_targets, discover_routes, free_port, load_fixtures, run_load, run_microbenchmarks, server_command
+)
+from .history import (
+    DEFAULT_HISTORY, compare_runs, connect, environment, git_info, latest_run, list_runs, load_run, record_run, resolve_baseline
+)
+from .memprofile import DEFAULT_MEMPROFILE_DIR, memprofile_run_command, memory_report
+from .profiling import DEFAULT_PROFILE_DIR, profile_run_command, profile_top
+from .seed import seed_model
+from .importer import detect_format, import_file
+from .slowlog import DEFAULT_SLOWLOG, aggregate_slowlog, read_slowlog, slowlog_files
 from .simple_interactive import SimpleInteractiveMode as InteractiveMode
 
 @click.group()
@@ -30,8 +48,9 @@ def main():
 @click.option('--auth', '-a', is_flag=True, help='Include authentication system')
 @click.option('--api', is_flag=True, help='Include API endpoints')
 @click.option('--frontend', '-f', default='bootstrap', help='Frontend framework (bootstrap, tailwind, none)')
+@click.option('--feature', 'features', multiple=True, help='Optional feature to include, repeatable (search, cache, query-cache, shared-cache, fragment-cache, timing, metrics, query-budget, slow-queries, sampler, benchmarks)')
 @click.option('--interactive', '-i', is_flag=True, help='Use interactive mode')
-def create(project_name, template, database, auth, api, frontend, interactive):
+def create(project_name, template, database, auth, api, frontend, features, interactive):
     """Create a new Flask project"""
     try:
         generator = ProjectGenerator()
@@ -50,7 +69,8 @@ def create(project_name, template, database, auth, api, frontend, interactive):
                 database=config['database'],
                 auth=config['auth'],
                 api=config['api'],
-                frontend=config['frontend']
+                frontend=config['frontend'],
+                features=['benchmarks'] if config['tests'] else []
             )
             
             interactive_mode.show_project_created_message(
@@ -65,7 +85,8 @@ def create(project_name, template, database, auth, api, frontend, interactive):
                 database=database,
                 auth=auth,
                 api=api,
-                frontend=frontend
+                frontend=frontend,
+                features=list(features)
             )
             print_success(f"Project '{project_name}' created successfully!")
             print_info(f"Location: {os.path.abspath(project_name)}")
@@ -81,7 +102,18 @@ def create(project_name, template, database, auth, api, frontend, interactive):
 @click.option('--port', default=5000, help='Port to run on')
 @click.option('--debug', is_flag=True, help='Run in debug mode')
 @click.option('--interactive', '-i', is_flag=True, help='Use interactive mode')
-def run(host, port, debug, interactive):
+@click.option('--profile', 'profile_dir', is_flag=False, flag_value=DEFAULT_PROFILE_DIR, default=None,
+              help=f'Write a cProfile file per request into a directory (default: {DEFAULT_PROFILE_DIR})')
+@click.option('--profile-sample', default=1.0, type=click.FloatRange(0, 1), help='Fraction of requests to profile')
+@click.option('--profile-path', 'profile_paths', multiple=True, help='Only profile paths starting with this, repeatable (both profilers)')
+@click.option('--profile-min-ms', default=0.0, help='Only keep profiles of requests at least this slow')
+@click.option('--memprofile', 'memprofile_dir', is_flag=False, flag_value=DEFAULT_MEMPROFILE_DIR, default=None,
+              help=f'Track memory per route with tracemalloc into a directory (default: {DEFAULT_MEMPROFILE_DIR})')
+@click.option('--memprofile-sample', default=0.01, type=click.FloatRange(0, 1), help='Fraction of requests to diff by source line (each diff takes two snapshots)')
+@click.option('--memprofile-interval', default=60.0, help='Seconds between whole-process snapshots')
+@click.option('--memprofile-frames', default=1, help='Stack frames kept per allocation')
+def run(host, port, debug, interactive, profile_dir, profile_sample, profile_paths, profile_min_ms,
+        memprofile_dir, memprofile_sample, memprofile_interval, memprofile_frames):
     """Run the current Flask project"""
     try:
         if not os.path.exists('run.py'):
@@ -102,13 +134,10 @@ def run(host, port, debug, interactive):
         print_info("Press Ctrl+C to stop the server")
         
         # Detect and use .venv automatically
-        if os.name == 'nt':  # Windows
-            python_cmd = os.path.join('.venv', 'Scripts', 'python.exe')
-        else:  # Unix/Linux/Mac
-            python_cmd = os.path.join('.venv', 'bin', 'python')
+        python_cmd = get_venv_python()
         
         # Fallback to system python if .venv doesn't exist
-        if not os.path.exists(python_cmd):
+        if python_cmd is None:
             python_cmd = "python"
             print_warning(".venv not found, using system Python")
         else:
@@ -116,10 +145,26 @@ def run(host, port, debug, interactive):
             print_info(f"Using virtual environment {Colors.BRIGHT_GREEN}(.venv){Colors.BRIGHT_CYAN} Python")
         
         # Build command with venv python
-        cmd = [python_cmd, "run.py", f"--host={host}", f"--port={port}"]
+        cmd = [python_cmd, "run.py", "--host", host, "--port", str(port)]
         if debug:
             cmd.append("--debug")
         
+        if profile_dir is not None and memprofile_dir is not None:
+            print_error(" --profile and --memprofile can't be used together, cProfile would skew the allocations.")
+            sys.exit(1)
+        
+        if memprofile_dir is not None:
+            cmd = memprofile_run_command(python_cmd, cmd[2:], memprofile_dir, memprofile_sample, memprofile_interval,
+                                         memprofile_frames, profile_paths)
+            print_info(f"Tracking memory into {memprofile_dir}/, summarize with 'flite profile memory'")
+            print_warning("tracemalloc slows the app down and uses extra memory, expect a few times slower requests")
+        
+        if profile_dir is not None:
+            cmd = profile_run_command(python_cmd, cmd[2:], profile_dir, profile_sample, profile_min_ms, profile_paths)
+            print_info(f"Profiling requests into {profile_dir}/, summarize with 'flite profile top'")
+            if debug:
+                print_warning("The reloader is off while profiling, restart the server after code changes")
+        
         subprocess.run(cmd, shell=False)
     except Exception as e:
         print_error(f" Error running project: {str(e)}")
@@ -146,6 +191,43 @@ if __name__ == "__main__":
     app.run()
 """)
         
+        # Precompile templates so workers skip parsing and compiling them
+        if os.path.isdir(os.path.join('app', 'templates')):
+            python_cmd = get_venv_python() or sys.executable
+            try:
+                report = precompile_templates(python_cmd)
+            except RuntimeError as e:
+                print_error(f" Could not load the app to precompile templates: {str(e)}")
+                sys.exit(1)
+            
+            for name, error in report['errors'].items():
+                print_error(f" {name}: {error}")
+            if report['errors']:
+                sys.exit(1)
+            
+            print_info(f"{len(report['templates'])} template(s) precompiled into {report['target']}")
+            print_info(
+                f"Cold template load: {report['load_before'] * 1000:.1f} ms -> {report['load_after'] * 1000:.1f} ms, "
+                f"first render: {report['render_before'] * 1000:.1f} ms -> {report['render_after'] * 1000:.1f} ms"
+            )
+            if not report['configured']:
+                print_warning("config.py has no TEMPLATE_CACHE_DIR, the app won't load the precompiled templates")
+        
+        # Byte-compile so the first import in each worker skips compiling
+        python_cmd = get_venv_python()
+        try:
+            report = byte_compile(python_cmd or sys.executable, '.venv' if python_cmd else None)
+        except RuntimeError as e:
+            print_error(f" Could not byte-compile the project: {str(e)}")
+            sys.exit(1)
+        
+        print_info(f"Project byte-compiled in {report['project']:.1f}s")
+        if report['venv'] is not None:
+            print_info(f"Virtual environment byte-compiled in {report['venv']:.1f}s")
+            if report['venv_errors']:
+                print_warning("Some files in .venv could not be compiled, they are imported from source")
+        print_info("Set PYTHONOPTIMIZE=1 on the server to use the optimized bytecode")
+        
         print_success("Project built for production!")
         print_info("wsgi.py file created")
         print_info("To deploy to production, use a WSGI server like Gunicorn")
@@ -153,6 +235,519 @@ if __name__ == "__main__":
         print_error(f" Error building project: {str(e)}")
         sys.exit(1)
 
+@main.command('startup-report')
+@click.option('--top', default=15, help='Number of entries per ranking')
+def startup_report(top):
+    """Rank the slowest imports and create_app steps of the current project"""
+    try:
+        if not os.path.exists('run.py'):
+            print_error(" run.py not found. Make sure you're in a valid Flask project.")
+            sys.exit(1)
+        
+        print_info("Starting the app under -X importtime...")
+        try:
+            report = run_startup_report(get_venv_python() or sys.executable)
+        except RuntimeError as e:
+            print_error(f" Could not start the app: {str(e)}")
+            sys.exit(1)
+        
+        print_info(f"Process start to first response: {report['process'] * 1000:.0f} ms")
+        print(f"  import app        {report['import_app'] * 1000:8.1f} ms")
+        print(f"  create_app()      {report['create_app'] * 1000:8.1f} ms")
+        print(f"  first request     {report['first_request'] * 1000:8.1f} ms  (GET / -> {report['first_status']})")
+        
+        by_package, by_module = slowest_imports(report['imports'], top)
+        print_info("Slowest packages (cumulative import time):")
+        for name, microseconds in by_package:
+            print(f"  {microseconds / 1000:8.1f} ms  {name}")
+        print_info("Slowest modules (own import time):")
+        for name, microseconds in by_module:
+            print(f"  {microseconds / 1000:8.1f} ms  {name}")
+        
+        print_info("Slowest create_app steps (including the calls they make):")
+        for step in report['steps'][:top]:
+            print(f"  {step['seconds'] * 1000:8.1f} ms  {step['location']}  {step['source']}")
+        print_info("Timings run under -X importtime and line tracing, expect them to be inflated")
+    except Exception as e:
+        print_error(f" Error profiling startup: {str(e)}")
+        sys.exit(1)
+
+@main.group()
+def db():
+    """Database tools for the current project"""
+    pass
+
+@db.command()
+@click.argument('path', required=False, default=DEFAULT_SLOWLOG)
+@click.option('--top', default=10, help='Number of statements to show')
+@click.option('--sort', type=click.Choice(['total', 'count', 'mean', 'p95', 'max']), default='total', help='Rank statements by')
+@click.option('--plans', is_flag=True, help='Show the plan of the slowest run of each statement')
+def slowlog(path, top, sort, plans):
+    """Summarize the slow-query log by normalized statement"""
+    try:
+        paths = slowlog_files(path)
+        if not paths:
+            print_error(f" {path} not found. Enable the slow-queries feature, or pass the SLOW_QUERY_LOG path.")
+            sys.exit(1)
+        
+        summary = aggregate_slowlog(read_slowlog(paths), sort)
+        print_info(f"{sum(group['count'] for group in summary)} slow statement(s) in {len(paths)} file(s), {len(summary)} distinct")
+        for group in summary[:top]:
+            print(f"\n  {group['count']:6d} x  total {group['total_ms']:10.1f} ms  mean {group['mean_ms']:8.1f} ms  "
+                  f"p95 {group['p95_ms']:8.1f} ms  max {group['max_ms']:8.1f} ms")
+            print(f"  {group['statement']}")
+            for route, count in group['routes'][:3]:
+                print(f"    {count:6d} x  {route}")
+            if plans and group['plan']:
+                for step in group['plan']:
+                    print(f"      plan: {json.dumps(step) if isinstance(step, dict) else step}")
+    except Exception as e:
+        print_error(f" Error reading the slow-query log: {str(e)}")
+        sys.exit(1)
+
+@db.command()
+@click.option('--rows', default=2000, help='Synthetic rows per table on the scratch database')
+@click.option('--path', 'paths', multiple=True, help='Extra path to request, repeatable (e.g. /api/examples/search?q=a)')
+@click.option('--database-url', default=None, help='Disposable database to analyze instead of a scratch SQLite file')
+@click.option('--migration', is_flag=True, help='Write an Alembic migration creating the suggested indexes')
+def analyze(rows, paths, database_url, migration):
+    """Suggest indexes for the statements the project's GET routes send"""
+    try:
+        if not os.path.exists('run.py'):
+            print_error(" run.py not found. Make sure you're in a valid Flask project.")
+            sys.exit(1)
+        
+        print_info(f"Requesting the GET routes on {'the given database' if database_url else 'a scratch SQLite database'}...")
+        try:
+            report = analyze_indexes(get_venv_python() or sys.executable, database_url, rows, paths)
+        except RuntimeError as e:
+            print_error(f" Could not run the app: {str(e)}")
+            sys.exit(1)
+        
+        print_info(f"{len(report['routes'])} route(s) requested, {report['statements']} distinct SELECT statement(s), "
+                   f"{report['rows']} rows per empty table on {report['database']}")
+        for route in report['routes']:
+            if not isinstance(route['status'], int) or route['status'] >= 500:
+                print_warning(f"GET {route['path']} failed: {route['status']}")
+        
+        unit = report['unit']
+        for suggestion in report['suggested']:
+            print_success(f"CREATE INDEX {suggestion['name']} ON {suggestion['table']} ({', '.join(suggestion['columns'])})")
+            change = (suggestion['after'] - suggestion['before']) / suggestion['before'] * 100 if suggestion['before'] else 0
+            print(f"    {unit} {suggestion['before']:.3f} -> {suggestion['after']:.3f} ({change:+.0f}%)")
+            for statement in suggestion['statements']:
+                print(f"    {', '.join(statement['routes'])}")
+                print(f"      before: {'; '.join(statement['plan_before'])}")
+                print(f"      after:  {'; '.join(statement['plan_after'])}")
+            columns = ', '.join(repr(column) for column in suggestion['columns'])
+            print(f"    In the model: __table_args__ = (db.Index('{suggestion['name']}', {columns}),)")
+        for suggestion in report['rejected']:
+            print_info(f"Not worth it: {suggestion['name']} ({unit} {suggestion['before']:.3f} -> {suggestion['after']:.3f})")
+        if not report['suggested']:
+            print_success("No missing indexes found for the statements the routes sent")
+            return
+        if report['unit'] == 'ms':
+            print_info("SQLite has no cost estimates, the numbers are measured times on the synthetic rows")
+        
+        if migration:
+            try:
+                path = write_index_migration(report['suggested'])
+            except RuntimeError as e:
+                print_error(f" Could not write the migration: {str(e)}")
+                sys.exit(1)
+            print_success(f"Migration written to {path}, apply it with 'flask db upgrade'")
+    except Exception as e:
+        print_error(f" Error analyzing indexes: {str(e)}")
+        sys.exit(1)
+
+@db.command(name='seed')
+@click.option('--model', required=True, help='Model class (or table name) to fill, e.g. ExampleModel')
+@click.option('--rows', default=1000, help='Number of rows to add')
+@click.option('--seed', 'random_seed', default=0, help='Random seed, the same seed gives the same rows')
+@click.option('--batch-size', default=10000, help='Rows per insert batch')
+@click.option('--database-url', default=None, help='Database to fill instead of the configured one')
+def seed(model, rows, random_seed, batch_size, database_url):
+    """Add synthetic rows to a model's table, made up from its column types"""
+    try:
+        if not os.path.exists('run.py'):
+            print_error(" run.py not found. Make sure you're in a valid Flask project.")
+            sys.exit(1)
+        if rows < 1 or batch_size < 1:
+            print_error(" --rows and --batch-size must be at least 1")
+            sys.exit(1)
+        
+        print_info(f"Adding {rows:,} {model} rows (seed {random_seed})...")
+        try:
+            report = seed_model(get_venv_python() or sys.executable, model, rows, random_seed, batch_size, database_url)
+        except RuntimeError as e:
+            print_error(f" Could not seed {model}: {str(e)}")
+            sys.exit(1)
+        
+        rate = report['rows'] / report['seconds'] if report['seconds'] else 0
+        print_success(f"{report['rows']:,} rows added to {report['table']} in {report['seconds']:.1f}s "
+                      f"({rate:,.0f} rows/s, {report['method']} on {report['database']})")
+        if report['existing']:
+            print_info(f"{report['table']} now has {report['existing'] + report['rows']:,} rows")
+    except Exception as e:
+        print_error(f" Error seeding the database: {str(e)}")
+        sys.exit(1)
+
+@db.command(name='import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--model', required=True, help='Model class (or table name) to load, e.g. ExampleModel')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'ndjson']), default=None, help='Input format (default: from the extension)')
+@click.option('--batch-size', default=1000, help='Rows per transaction, the checkpoint moves with each')
+@click.option('--map', 'mappings', multiple=True, help='FIELD=COLUMN, load a field into a column of another name (FIELD= skips it), repeatable')
+@click.option('--max-errors', default=100, help='Rejected rows tolerated before the import stops')
+@click.option('--rejects', default=None, help='File for the rejected rows (default: PATH.rejects.ndjson)')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint of an interrupted import and start from the top')
+@click.option('--database-url', default=None, help='Database to load instead of the configured one')
+def import_rows(path, model, file_format, batch_size, mappings, max_errors, rejects, restart, database_url):
+    """Stream a CSV or NDJSON file into a model's table, resuming where an interrupted import stopped"""
+    try:
+        if not os.path.exists('run.py'):
+            print_error(" run.py not found. Make sure you're in a valid Flask project.")
+            sys.exit(1)
+        if batch_size < 1 or max_errors < 0:
+            print_error(" --batch-size must be at least 1 and --max-errors at least 0")
+            sys.exit(1)
+        if not (file_format or detect_format(path)):
+            print_error(f" Can't tell the format of {path} from its extension, pass --format csv or --format ndjson")
+            sys.exit(1)
+        mapping = {}
+        for item in mappings:
+            field, sep, column = item.partition('=')
+            if not sep or not field:
+                print_error(f" --map {item}: expected FIELD=COLUMN")
+                sys.exit(1)
+            mapping[field] = column
+        
+        print_info(f"Importing {path} into {model}...")
+        try:
+            report = import_file(get_venv_python() or sys.executable, path, model, file_format, batch_size, mapping,
+                                 restart, max_errors, rejects, database_url)
+        except RuntimeError as e:
+            print_error(f" Could not import {path}: {str(e)}")
+            sys.exit(1)
+        
+        rate = report['rows'] / report['seconds'] if report['seconds'] else 0
+        if report['resumed_from']:
+            print_info(f"Resumed after line {report['resumed_from']:,}")
+        print_success(f"{report['rows']:,} rows imported into {report['table']} in {report['seconds']:.1f}s "
+                      f"({rate:,.0f} rows/s on {report['database']})")
+        if report['rejected']:
+            print_warning(f"{report['rejected']:,} rows rejected, see {rejects or path + '.rejects.ndjson'}")
+        if report['ignored']:
+            print_warning(f"Fields matching no column, not imported: {', '.join(report['ignored'])}")
+    except Exception as e:
+        print_error(f" Error importing {path}: {str(e)}")
+        sys.exit(1)
+
+@main.group()
+def profile():
+    """Profiling reports for the current project"""
+    pass
+
+@profile.command()
+@click.argument('directory', required=False, default=DEFAULT_PROFILE_DIR)
+@click.option('--top', default=10, help='Number of functions per route')
+@click.option('--sort', type=click.Choice(['tottime', 'cumtime', 'calls']), default='tottime', help='Rank functions by own time, time including callees, or calls')
+@click.option('--route', default=None, help='Only this route, e.g. "GET /api/examples"')
+def top(directory, top, sort, route):
+    """Merge the profiles of 'flite run --profile' and rank the hottest functions per route"""
+    try:
+        summary = profile_top(directory, top, sort, route)
+        if not summary:
+            print_error(f" No profiles in {directory}. Capture some with 'flite run --profile'.")
+            sys.exit(1)
+        
+        for group in summary:
+            print_info(f"{group['route']}: {group['requests']} request(s), {group['total_ms']:.1f} ms in total")
+            print(f"  {'calls':>9}  {'own ms':>9}  {'total ms':>9}  function")
+            for label, calls, tottime, cumtime in group['functions']:
+                print(f"  {calls:9d}  {tottime * 1000:9.2f}  {cumtime * 1000:9.2f}  {label}")
+    except Exception as e:
+        print_error(f" Error reading profiles: {str(e)}")
+        sys.exit(1)
+
+def _format_bytes(size):
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+@profile.command()
+@click.argument('directory', required=False, default=DEFAULT_MEMPROFILE_DIR)
+@click.option('--top', default=10, help='Number of entries per section')
+def memory(directory, top):
+    """Report memory growth per route and line from 'flite run --memprofile'"""
+    try:
+        report = memory_report(directory, top)
+        if report is None:
+            print_error(f" No snapshots in {directory}. Capture some with 'flite run --memprofile'.")
+            sys.exit(1)
+        
+        traced_first, traced_last = report['traced']
+        print_info(f"{report['snapshots']} snapshot(s) over {report['seconds'] / 60:.1f} min: traced memory "
+                   f"{_format_bytes(traced_first)} -> {_format_bytes(traced_last)}, peak {_format_bytes(report['peak'])}")
+        rss_first, rss_last = report['rss']
+        if rss_first is not None and rss_last is not None:
+            print_info(f"RSS {_format_bytes(rss_first)} -> {_format_bytes(rss_last)}")
+        
+        print_info("Memory left allocated after requests, per route:")
+        for route in report['routes']:
+            print(f"  {_format_bytes(route['retained']):>10}  {route['requests']:7d} request(s)  "
+                  f"{_format_bytes(route['per_request']):>10}/request  {route['route']}")
+        
+        print_info("Largest allocators now (live memory by line):")
+        for allocator in report['allocators']:
+            print(f"  {_format_bytes(allocator['size']):>10}  {allocator['count']:8d} block(s)  {allocator['line']}")
+        
+        if report['leaks']:
+            print_warning("Suspected leaks (grew in every snapshot):")
+            for leak in report['leaks']:
+                print(f"  +{_format_bytes(leak['growth']):>10}  over {leak['snapshots']} snapshots, now {_format_bytes(leak['size'])}  {leak['line']}")
+        elif report['snapshots'] < 3:
+            print_info("Leak detection needs at least 3 snapshots, run longer or lower --memprofile-interval")
+        
+        if report['retained_lines']:
+            print_info("Lines sampled requests left allocated:")
+            for entry in report['retained_lines']:
+                routes = ', '.join(route for route, count in sorted(entry['routes'].items(), key=lambda item: item[1], reverse=True)[:2])
+                print(f"  {_format_bytes(entry['size']):>10}  in {entry['requests']:5d} request(s)  {entry['line']}  ({routes})")
+    except Exception as e:
+        print_error(f" Error reading memory profile: {str(e)}")
+        sys.exit(1)
+
+def _format_ms(ms):
+    if ms is None:
+        return f"{'-':>8}"
+    return f"{ms:8.3f}" if ms < 10 else f"{ms:8.1f}"
+
+def print_bench_report(report):
+    """Print the per-route table of a benchmark run"""
+    total = report['total']
+    print_info(f"{total['requests']} requests in {report['duration']:.1f}s, {total['rps']:.1f} req/s, "
+               f"{total['error_rate'] * 100:.2f}% errors")
+    print(f"  {'route':<40} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for route in report['routes'] + [total]:
+        print(f"  {route['route']:<40} {route['requests']:8d} {route['rps']:8.1f} {_format_ms(route['p50_ms'])} "
+              f"{_format_ms(route['p90_ms'])} {_format_ms(route['p99_ms'])} {_format_ms(route['max_ms'])} "
+              f"{route['error_rate'] * 100:6.1f}%")
+    for route in report['routes']:
+        failures = {**{status: count for status, count in route['statuses'].items() if int(status) >= 400}, **route['exceptions']}
+        if failures:
+            print_warning(f"{route['route']}: " + ', '.join(f"{count} x {outcome}" for outcome, count in failures.items()))
+
+@main.group(invoke_without_command=True)
+@click.option('--duration', default=10.0, help='Seconds to measure')
+@click.option('--warmup', default=2.0, help='Seconds of load before measuring')
+@click.option('--concurrency', '-c', default=10, help='Concurrent connections')
+@click.option('--rate', default=0.0, help='Requests per second over all connections, 0 sends as fast as answered')
+@click.option('--timeout', default=5.0, help='Seconds before a request counts as failed')
+@click.option('--route', 'prefixes', multiple=True, help='Only routes whose rule starts with this, repeatable')
+@click.option('--fixtures', type=click.Path(dir_okay=False), default=None,
+              help=f'JSON request fixtures keyed by "METHOD /rule" (default: {DEFAULT_FIXTURES} when present)')
+@click.option('--server', type=click.Choice(['run', 'gunicorn']), default='run',
+              help='Serve with run.py (development server) or gunicorn on wsgi.py')
+@click.option('--workers', default=2, help='gunicorn worker processes')
+@click.option('--url', default=None, help='Load an already running server instead of starting one')
+@click.option('--save/--no-save', default=True, help=f'Record the run in {DEFAULT_HISTORY} (default: save)')
+@click.pass_context
+def bench(ctx, duration, warmup, concurrency, rate, timeout, prefixes, fixtures, server, workers, url, save):
+    """Load the project's routes and report latency percentiles per route"""
+    if ctx.invoked_subcommand is not None:
+        return
+    try:
+        if not os.path.exists('run.py'):
+            print_error(" run.py not found. Make sure you're in a valid Flask project.")
+            sys.exit(1)
+        if server == 'gunicorn' and url is None and not os.path.exists('wsgi.py'):
+            print_error(" wsgi.py not found, create it with 'flite build'.")
+            sys.exit(1)
+        
+        python_cmd = get_venv_python() or sys.executable
+        try:
+            routes = discover_routes(python_cmd)
+        except RuntimeError as e:
+            print_error(f" Could not load the app to list its routes: {str(e)}")
+            sys.exit(1)
+        
+        if fixtures is None and os.path.exists(DEFAULT_FIXTURES):
+            fixtures = DEFAULT_FIXTURES
+        targets, skipped = build_targets(routes, load_fixtures(fixtures) if fixtures else None, prefixes)
+        for label, reason in skipped:
+            print_warning(f"Skipping {label}: {reason}")
+        if not targets:
+            print_error(" No route to load.")
+            sys.exit(1)
+        
+        mode = f"{rate:g} req/s" if rate else "as fast as answered"
+        print_info(f"Loading {len(targets)} route(s) with {concurrency} connection(s), {mode}: "
+                   f"{warmup:g}s warm-up then {duration:g}s measured")
+        if url is not None:
+            report = run_load(url, targets, concurrency, rate, warmup, duration, timeout)
+        else:
+            port = free_port()
+            try:
+                with BenchServer(server_command(python_cmd, server, '127.0.0.1', port, workers), '127.0.0.1', port) as running:
+                    report = run_load(running.url, targets, concurrency, rate, warmup, duration, timeout)
+            except RuntimeError as e:
+                print_error(f" Could not start the server: {str(e)}")
+                sys.exit(1)
+        
+        print_bench_report(report)
+        if server == 'run' and url is None:
+            print_info("The development server is single-process, use --server gunicorn for production numbers")
+        
+        if save:
+            settings = {
+                'server': 'external' if url else server,
+                'workers': workers if server == 'gunicorn' and url is None else None,
+                'concurrency': concurrency,
+                'rate': rate,
+                'warmup': warmup,
+                'duration': duration,
+                'timeout': timeout,
+                'routes': sorted(target.label for target in targets)
+            }
+            git = git_info()
+            with closing(connect()) as connection:
+                run_id = record_run(connection, 'load', report, settings, environment(python_cmd), git)
+            commit = f" on {git['commit'][:7]}{' (uncommitted changes)' if git['dirty'] else ''}" if git['commit'] else ''
+            print_info(f"Recorded as run #{run_id}{commit}, compare with 'flite bench compare'")
+    except Exception as e:
+        print_error(f" Error running benchmark: {str(e)}")
+        sys.exit(1)
+
+@bench.command('micro')
+@click.option('--iterations', default=200, help='Calls measured per route')
+@click.option('--warmup', default=20, help='Calls per route before measuring')
+@click.option('--route', 'prefixes', multiple=True, help='Only routes whose rule starts with this, repeatable')
+@click.option('--no-memory', is_flag=True, help='Skip the tracemalloc pass')
+@click.option('--save/--no-save', default=True, help=f'Record the run in {DEFAULT_HISTORY} (default: save)')
+def bench_micro(iterations, warmup, prefixes, no_memory, save):
+    """Run the generated route microbenchmarks and record them"""
+    try:
+        if not os.path.exists(os.path.join('benchmarks', 'routes.py')):
+            print_error(" benchmarks/ not found. Create the project with --feature benchmarks.")
+            sys.exit(1)
+        
+        python_cmd = get_venv_python() or sys.executable
+        try:
+            report = run_microbenchmarks(python_cmd, iterations, warmup, not no_memory, prefixes)
+        except RuntimeError as e:
+            print_error(f" The benchmarks failed: {str(e)}")
+            sys.exit(1)
+        
+        for route in report['routes']:
+            if route['error_rate']:
+                print_warning(f"{route['route']} answered {', '.join(route['statuses'])}, its timings may not be meaningful")
+        
+        if save:
+            settings = {
+                'iterations': iterations,
+                'warmup': warmup,
+                'routes': sorted(route['route'] for route in report['routes'])
+            }
+            git = git_info()
+            with closing(connect()) as connection:
+                run_id = record_run(connection, 'micro', report, settings, environment(python_cmd), git)
+            commit = f" on {git['commit'][:7]}{' (uncommitted changes)' if git['dirty'] else ''}" if git['commit'] else ''
+            print_info(f"Recorded as run #{run_id}{commit}, compare with 'flite bench compare --kind micro'")
+    except Exception as e:
+        print_error(f" Error running benchmarks: {str(e)}")
+        sys.exit(1)
+
+@bench.command('history')
+@click.option('--limit', default=20, help='Number of runs to list')
+def bench_history(limit):
+    """List the recorded benchmark runs, latest first"""
+    if not os.path.exists(DEFAULT_HISTORY):
+        print_error(" No benchmark recorded yet, run 'flite bench' first.")
+        sys.exit(1)
+    try:
+        with closing(connect()) as connection:
+            runs = list_runs(connection, limit=limit)
+    except sqlite3.Error as e:
+        print_error(f" Error reading {DEFAULT_HISTORY}: {str(e)}")
+        sys.exit(1)
+    print(f"  {'run':>5}  {'date':<16}  {'kind':<5}  {'commit':<9}  {'branch':<16}  {'routes':>6}  {'req/s':>8}  {'p50 ms':>8}  {'p99 ms':>8}  {'errors':>7}")
+    for run in runs:
+        commit = (run['git_commit'] or '-')[:7] + ('*' if run['git_dirty'] else '')
+        total = run['total'] or {}
+        rps = f"{total['rps']:8.1f}" if total.get('rps') is not None else f"{'-':>8}"
+        errors = f"{total['error_rate'] * 100:6.1f}%" if total.get('error_rate') is not None else f"{'-':>7}"
+        print(f"  {'#' + str(run['id']):>5}  {datetime.fromtimestamp(run['created']).strftime('%Y-%m-%d %H:%M'):<16}  "
+              f"{run['kind']:<5}  {commit:<9}  {(run['git_branch'] or '-')[:16]:<16}  {run['routes']:6d}  {rps}  "
+              f"{_format_ms(total.get('p50_ms'))}  {_format_ms(total.get('p99_ms'))}  {errors}")
+    print_info("* uncommitted changes")
+
+def _format_change(change):
+    return f"{change * 100:+7.1f}%" if change is not None else f"{'-':>8}"
+
+@bench.command('compare')
+@click.argument('baseline', required=False)
+@click.option('--run', 'run_id', type=int, default=None, help='Run to check (default: the latest)')
+@click.option('--kind', type=click.Choice(['load', 'micro']), default=None, help='Kind of run, when --run is not given')
+@click.option('--baseline-runs', default=5, help='Runs of the baseline commit pooled together')
+@click.option('--alpha', default=0.01, help='Significance level of the Mann-Whitney U test')
+@click.option('--threshold', default=0.05, help='Smallest median change that counts, as a fraction')
+def bench_compare(baseline, run_id, kind, baseline_runs, alpha, threshold):
+    """Compare a run with a baseline, exit 1 on a significant regression
+
+    BASELINE is a run id like #12, or a git ref whose commit's runs are
+    pooled. By default the latest commit benchmarked before the run's.
+    """
+    if not os.path.exists(DEFAULT_HISTORY):
+        print_error(" No benchmark recorded yet, run 'flite bench' first.")
+        sys.exit(1)
+    try:
+        with closing(connect()) as connection:
+            candidate = load_run(connection, run_id) if run_id is not None else latest_run(connection, kind)
+            if candidate is None:
+                print_error(f" Run #{run_id} not found." if run_id is not None else " No run to compare.")
+                sys.exit(1)
+            baseline_runs = resolve_baseline(connection, candidate, baseline, baseline_runs)
+    except sqlite3.Error as e:
+        print_error(f" Error reading {DEFAULT_HISTORY}: {str(e)}")
+        sys.exit(1)
+    if not baseline_runs:
+        print_error(f" No {candidate['kind']} run to compare #{candidate['id']} with"
+                    + (f" for {baseline}." if baseline else ", record one on an earlier commit or pass a run id."))
+        sys.exit(1)
+    
+    comparison = compare_runs(baseline_runs, candidate, alpha, threshold)
+    print_info(f"Run #{candidate['id']} against " + ', '.join(f"#{run['id']}" for run in baseline_runs)
+               + (f" ({baseline_runs[0]['git_commit'][:7]})" if baseline_runs[0]['git_commit'] else ''))
+    if len(baseline_runs) == 1:
+        print_warning("A single baseline run: its own run-to-run noise is unknown, record a few more for a reliable verdict")
+    for key, (before, after) in comparison['mismatches'].items():
+        print_warning(f"{key} differs: {', '.join(map(str, before))} -> {after}")
+    
+    print(f"  {'route':<40} {'p50 before':>10} {'p50 after':>10} {'change':>8} {'p99 before':>10} {'p99 after':>10} {'p value':>8}  verdict")
+    for route in comparison['routes']:
+        p_value = f"{route['p_value']:8.4f}" if route['p_value'] is not None else f"{'-':>8}"
+        print(f"  {route['route']:<40} {_format_ms(route['baseline']):>10} {_format_ms(route['candidate']):>10} "
+              f"{_format_change(route['change'])} {_format_ms(route['baseline_p99']):>10} {_format_ms(route['candidate_p99']):>10} "
+              f"{p_value}  {route['verdict']}")
+        if route['candidate_error_rate'] > route['baseline_error_rate'] + 0.001:
+            print_warning(f"{route['route']}: error rate {route['baseline_error_rate'] * 100:.1f}% -> "
+                          f"{route['candidate_error_rate'] * 100:.1f}%, fast failures can hide a latency regression")
+    
+    throughput = comparison['throughput']
+    if throughput is not None and throughput['baseline'] is not None:
+        print_info(f"Throughput: {throughput['baseline']:.1f} -> {throughput['candidate']:.1f} req/s "
+                   f"({throughput['change'] * 100:+.1f}%, p={throughput['p_value']:.4f}), {throughput['verdict']}")
+    elif throughput is not None:
+        print_info("Throughput not compared: runs need a --duration of at least 8 seconds")
+    
+    if comparison['regressions']:
+        print_error(f" Significant regression in: {', '.join(comparison['regressions'])}")
+        sys.exit(1)
+    print_success("No significant regression")
+
 @main.command()
 def init():
     """Initialize a Flask project in the current directory"""
@@ -186,7 +781,8 @@ def interactive():
             database=config['database'],
             auth=config['auth'],
             api=config['api'],
-            frontend=config['frontend']
+            frontend=config['frontend'],
+            features=['benchmarks'] if config['tests'] else []
         )
         
         interactive_mode.show_project_created_message(
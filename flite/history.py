@@ -0,0 +1,328 @@
+"""
+Benchmark history and regression detection for Flite projects
+"""
+
+import json
+import math
+import os
+import platform
+import sqlite3
+import subprocess
+import time
+
+DEFAULT_HISTORY = os.path.join('.flite', 'bench.db')
+
+# Fewer samples than this on either side and the normal approximation of
+# the Mann-Whitney U test isn't trusted
+MIN_SAMPLES = 8
+
+# Latencies of one run are correlated, a slow second slows every request
+# in it, so thousands of them make any difference look significant. Each
+# run's samples, in completion order, are cut into this many consecutive
+# blocks and the test compares the block medians instead.
+BLOCKS = 10
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    git_commit TEXT,
+    git_branch TEXT,
+    git_dirty INTEGER,
+    environment TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    per_second TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_runs_kind_commit ON runs (kind, git_commit);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    route TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    rps REAL,
+    error_rate REAL,
+    mean_ms REAL,
+    p50_ms REAL,
+    p90_ms REAL,
+    p99_ms REAL,
+    max_ms REAL,
+    samples TEXT NOT NULL,
+    PRIMARY KEY (run_id, route)
+);
+'''
+
+def connect(path=DEFAULT_HISTORY):
+    """Open the history database, creating it on first use"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.executescript(SCHEMA)
+    return connection
+
+def _git(*args):
+    try:
+        result = subprocess.run(['git'] + list(args), capture_output=True, text=True, shell=False)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def git_info():
+    """The commit, branch and dirtiness of the working tree, None outside git"""
+    commit = _git('rev-parse', 'HEAD')
+    if commit is None:
+        return {'commit': None, 'branch': None, 'dirty': None}
+    return {
+        'commit': commit,
+        'branch': _git('rev-parse', '--abbrev-ref', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no'))
+    }
+
+def environment(python_cmd=None):
+    """What the numbers depend on besides the code"""
+    info = {
+        'hostname': platform.node(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'client_python': platform.python_version()
+    }
+    if python_cmd is not None:
+        result = subprocess.run([python_cmd, '-c', 'import platform; print(platform.python_version())'],
+                                capture_output=True, text=True, shell=False)
+        info['python'] = result.stdout.strip() if result.returncode == 0 else None
+    return info
+
+def record_run(connection, kind, report, settings, env, git):
+    """Store a report of run_load (or of the same shape), returns the run id
+
+    Each route of the report is stored with its latency samples, and the
+    total under the route 'total'.
+    """
+    with connection:
+        cursor = connection.execute(
+            'INSERT INTO runs (created, kind, git_commit, git_branch, git_dirty, environment, settings, per_second) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                time.time(), kind, git['commit'], git['branch'],
+                None if git['dirty'] is None else int(git['dirty']),
+                json.dumps(env, sort_keys=True), json.dumps(settings, sort_keys=True),
+                json.dumps(report['per_second']) if report.get('per_second') is not None else None
+            )
+        )
+        run_id = cursor.lastrowid
+        connection.executemany(
+            'INSERT INTO results (run_id, route, requests, rps, error_rate, mean_ms, p50_ms, p90_ms, p99_ms, max_ms, samples) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [
+                (
+                    run_id, route['route'], route['requests'], route.get('rps'), route.get('error_rate'),
+                    route.get('mean_ms'), route.get('p50_ms'), route.get('p90_ms'), route.get('p99_ms'),
+                    route.get('max_ms'), json.dumps(report['samples'].get(route['route'], []))
+                )
+                for route in report['routes'] + ([report['total']] if 'total' in report else [])
+            ]
+        )
+    return run_id
+
+def _run(row):
+    run = dict(row)
+    run['environment'] = json.loads(run['environment'])
+    run['settings'] = json.loads(run['settings'])
+    run['per_second'] = json.loads(run['per_second']) if run['per_second'] is not None else None
+    return run
+
+def list_runs(connection, kind=None, limit=20):
+    """The latest runs first, each with its total row when it has one"""
+    query = 'SELECT * FROM runs' + (' WHERE kind = ?' if kind else '') + ' ORDER BY id DESC LIMIT ?'
+    runs = [_run(row) for row in connection.execute(query, ((kind,) if kind else ()) + (limit,))]
+    for run in runs:
+        total = connection.execute(
+            'SELECT requests, rps, error_rate, p50_ms, p99_ms FROM results WHERE run_id = ? AND route = ?', (run['id'], 'total')
+        ).fetchone()
+        run['total'] = dict(total) if total is not None else None
+        run['routes'] = connection.execute(
+            'SELECT COUNT(*) FROM results WHERE run_id = ? AND route != ?', (run['id'], 'total')
+        ).fetchone()[0]
+    return runs
+
+def load_run(connection, run_id):
+    """A run with its results by route, samples included, or None"""
+    row = connection.execute('SELECT * FROM runs WHERE id = ?', (run_id,)).fetchone()
+    if row is None:
+        return None
+    run = _run(row)
+    run['results'] = {}
+    for result in connection.execute('SELECT * FROM results WHERE run_id = ?', (run_id,)):
+        result = dict(result)
+        result['samples'] = json.loads(result['samples'])
+        run['results'][result['route']] = result
+    return run
+
+def latest_run(connection, kind=None):
+    row = connection.execute(
+        'SELECT id FROM runs' + (' WHERE kind = ?' if kind else '') + ' ORDER BY id DESC LIMIT 1', (kind,) if kind else ()
+    ).fetchone()
+    return load_run(connection, row[0]) if row is not None else None
+
+def resolve_baseline(connection, candidate, ref=None, runs=5):
+    """The runs to compare the candidate with
+
+    ref is a run id, or a git ref whose commit's latest runs are pooled.
+    Without ref, the latest commit benchmarked before the candidate's.
+    Only runs of the candidate's kind count.
+    """
+    if ref is not None and ref.lstrip('#').isdigit():
+        baseline = load_run(connection, int(ref.lstrip('#')))
+        return [baseline] if baseline is not None and baseline['kind'] == candidate['kind'] else []
+
+    if ref is not None:
+        commit = _git('rev-parse', '--verify', '--quiet', f'{ref}^{{commit}}')
+        commits = [commit] if commit else [
+            row[0] for row in connection.execute(
+                'SELECT DISTINCT git_commit FROM runs WHERE kind = ? AND git_commit LIKE ?', (candidate['kind'], f'{ref}%')
+            )
+        ]
+        if len(commits) != 1:
+            return []
+        commit = commits[0]
+    else:
+        row = connection.execute(
+            'SELECT git_commit FROM runs WHERE kind = ? AND id < ? AND git_commit IS NOT ? ORDER BY id DESC LIMIT 1',
+            (candidate['kind'], candidate['id'], candidate['git_commit'])
+        ).fetchone()
+        if row is None or row[0] is None:
+            # Outside git, or never benchmarked on another commit: the run before
+            row = connection.execute(
+                'SELECT id FROM runs WHERE kind = ? AND id < ? ORDER BY id DESC LIMIT 1', (candidate['kind'], candidate['id'])
+            ).fetchone()
+            return [load_run(connection, row[0])] if row is not None else []
+        commit = row[0]
+
+    ids = connection.execute(
+        'SELECT id FROM runs WHERE kind = ? AND git_commit = ? AND id != ? ORDER BY id DESC LIMIT ?',
+        (candidate['kind'], commit, candidate['id'], runs)
+    ).fetchall()
+    return [load_run(connection, row[0]) for row in ids]
+
+def mann_whitney(a, b):
+    """Two-sided Mann-Whitney U test, normal approximation with tie correction
+
+    Returns (U of a, p value). Doesn't assume normal latencies, only that
+    the samples are independent.
+    """
+    n1, n2 = len(a), len(b)
+    combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+    rank_sum = 0.0
+    ties = 0.0
+    i = 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        # Tied values share the mean of their ranks, 1-based
+        rank = (i + j) / 2 + 1
+        rank_sum += rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 0)
+        count = j - i + 1
+        ties += count ** 3 - count
+        i = j + 1
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return u, min(math.erfc(max(z, 0) / math.sqrt(2)), 1.0)
+
+def _median(values):
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+def block_medians(samples, blocks=BLOCKS):
+    """Medians of consecutive blocks of samples"""
+    size = len(samples) / blocks
+    if size < 1:
+        return []
+    return [_median(samples[round(i * size):round((i + 1) * size)]) for i in range(blocks)]
+
+def _change(before, after):
+    return after / before - 1 if before else (0.0 if after == before else math.inf)
+
+def _verdict(baseline_runs, candidate, alpha, threshold, higher_is_worse):
+    """Compare a candidate sample with baseline samples, one per run
+
+    The change has to exceed both the threshold and how far the baseline
+    runs' own medians are from each other.
+    """
+    baseline = [value for run in baseline_runs for value in run]
+    if len(baseline) < MIN_SAMPLES or len(candidate) < MIN_SAMPLES:
+        return {'baseline': None, 'candidate': None, 'change': None, 'noise': None, 'p_value': None, 'verdict': 'too few samples'}
+    before, after = _median(baseline), _median(candidate)
+    change = _change(before, after)
+    noise = max((abs(_change(before, _median(run))) for run in baseline_runs if run), default=0.0)
+    threshold = max(threshold, noise)
+    p_value = mann_whitney(candidate, baseline)[1]
+    worse = change > threshold if higher_is_worse else change < -threshold
+    better = change < -threshold if higher_is_worse else change > threshold
+    if p_value < alpha and worse:
+        verdict = 'regression'
+    elif p_value < alpha and better:
+        verdict = 'improvement'
+    else:
+        verdict = 'unchanged'
+    return {'baseline': before, 'candidate': after, 'change': change, 'noise': noise, 'p_value': p_value, 'verdict': verdict}
+
+def compare_runs(baseline_runs, candidate, alpha=0.01, threshold=0.05):
+    """Test the candidate's latency per route, and throughput, against the baseline
+
+    Block medians of the baseline runs are pooled. A route regresses when
+    its median latency is more than threshold higher, more than the
+    baseline runs differ among themselves, and the Mann-Whitney U test
+    rejects equal distributions at alpha; throughput the same way on the
+    requests completed per second. The test alone would flag shifts too
+    small to matter, the threshold alone a noisy run.
+    """
+    routes = []
+    for route, result in candidate['results'].items():
+        before = [block_medians(run['results'][route]['samples']) for run in baseline_runs if route in run['results']]
+        if not any(before):
+            continue
+        comparison = _verdict(before, block_medians(result['samples']), alpha, threshold, higher_is_worse=True)
+        before = [run['results'][route] for run in baseline_runs if route in run['results']]
+        p99s = [other['p99_ms'] for other in before if other['p99_ms'] is not None]
+        comparison.update({
+            'route': route,
+            'baseline_p99': _median(p99s) if p99s else None,
+            'candidate_p99': result['p99_ms'],
+            'baseline_error_rate': _median([other['error_rate'] or 0.0 for other in before]),
+            'candidate_error_rate': result['error_rate'] or 0.0
+        })
+        routes.append(comparison)
+    routes.sort(key=lambda comparison: (comparison['route'] == 'total', comparison['route']))
+
+    throughput = None
+    per_second = [run['per_second'] for run in baseline_runs if run['per_second']]
+    if per_second and candidate['per_second']:
+        throughput = _verdict(per_second, candidate['per_second'], alpha, threshold, higher_is_worse=False)
+
+    mismatches = {}
+    for field in ('settings', 'environment'):
+        for key, value in candidate[field].items():
+            others = {json.dumps(run[field].get(key), sort_keys=True) for run in baseline_runs}
+            if others != {json.dumps(value, sort_keys=True)}:
+                mismatches[key] = ([run[field].get(key) for run in baseline_runs], value)
+
+    regressions = [comparison['route'] for comparison in routes if comparison['verdict'] == 'regression']
+    if throughput is not None and throughput['verdict'] == 'regression':
+        regressions.append('throughput')
+    return {
+        'routes': routes,
+        'throughput': throughput,
+        'regressions': regressions,
+        'mismatches': mismatches,
+        'baseline_ids': [run['id'] for run in baseline_runs],
+        'candidate_id': candidate['id']
+    }
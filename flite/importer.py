@@ -0,0 +1,451 @@
+"""
+Bulk import of CSV and NDJSON files for Flite projects
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+
+FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}
+
+# Runs inside the project's interpreter. Reads the file one line at a time
+# from a byte offset, converts and validates every record against the
+# model's columns, and inserts batches of valid rows, one transaction per
+# batch. Each transaction also moves the import's checkpoint row (byte
+# offset, line, counts) in the flite_import_checkpoint table, so a batch
+# and its checkpoint are committed together and a resumed import neither
+# skips nor repeats rows. Rows the database refuses are found again one
+# SAVEPOINT at a time and rejected like invalid ones. The checkpoint is
+# removed when the import completes, and the table with the last one.
+IMPORT_SCRIPT = '''
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date, datetime, time as clock, timedelta
+from decimal import Decimal, InvalidOperation
+
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, Text, func, select, text
+from sqlalchemy import types as sqltypes
+from sqlalchemy.exc import DataError, IntegrityError
+
+(path, model_name, file_format, batch_size, max_errors, restart, database_url, rejects_path, mapping,
+ result_path) = sys.argv[1:]
+batch_size, max_errors, restart, mapping = int(batch_size), int(max_errors), restart == '1', json.loads(mapping)
+
+import config as project_config
+
+class ImportConfig(project_config.Config):
+    SQLALCHEMY_DATABASE_URI = database_url or getattr(project_config.Config, 'SQLALCHEMY_DATABASE_URI', None)
+    TESTING = False
+    METRICS_ENABLED = False
+    SLOW_QUERY_MS = None
+    QUERY_BUDGET_ENABLED = False
+
+from app import create_app
+
+app = create_app(ImportConfig)
+db = app.extensions.get('sqlalchemy')
+if db is None or not ImportConfig.SQLALCHEMY_DATABASE_URI:
+    raise SystemExit('The project has no database')
+
+mappers = list(db.Model.registry.mappers)
+mapper = next((m for m in mappers if m.class_.__name__ == model_name), None)
+mapper = mapper or next((m for m in mappers if m.local_table.name == model_name), None)
+if mapper is None:
+    raise SystemExit(f"No model called {model_name}, the models are {', '.join(sorted(m.class_.__name__ for m in mappers))}")
+table = mapper.local_table
+columns = {column.name: column for column in table.columns if column.computed is None}
+for field, name in mapping.items():
+    if name and name not in columns:
+        raise SystemExit(f"--map {field}={name}: {table.name} has no column {name}")
+
+CHECKPOINTS = Table(
+    'flite_import_checkpoint', MetaData(),
+    Column('key', String(40), primary_key=True),
+    Column('path', Text, nullable=False),
+    Column('head', String(40), nullable=False),
+    Column('header', Text),
+    Column('offset', BigInteger, nullable=False),
+    Column('line', BigInteger, nullable=False),
+    Column('rows', BigInteger, nullable=False),
+    Column('rejected', BigInteger, nullable=False)
+)
+# A file whose first bytes changed isn't the one the checkpoint is for
+HEAD_BYTES = 65536
+
+TRUE = {'1', 'true', 't', 'yes', 'y', 'on'}
+FALSE = {'0', 'false', 'f', 'no', 'n', 'off'}
+
+def converter(column):
+    """A function turning a field into the column's value, ValueError when it can't"""
+    kind = column.type
+    if isinstance(kind, sqltypes.Boolean):
+        def convert(value):
+            if isinstance(value, bool):
+                return value
+            if str(value).strip().lower() in TRUE:
+                return True
+            if str(value).strip().lower() in FALSE:
+                return False
+            raise ValueError('is not a boolean')
+    elif isinstance(kind, sqltypes.Enum):
+        def convert(value):
+            if value not in kind.enums:
+                raise ValueError(f"is not one of {', '.join(kind.enums)}")
+            return value
+    elif isinstance(kind, sqltypes.Integer):
+        def convert(value):
+            if isinstance(value, bool) or isinstance(value, float) and not value.is_integer():
+                raise ValueError('is not an integer')
+            return int(value)
+    elif isinstance(kind, sqltypes.Float):
+        def convert(value):
+            if isinstance(value, bool):
+                raise ValueError('is not a number')
+            return float(value)
+    elif isinstance(kind, sqltypes.Numeric):
+        def convert(value):
+            if isinstance(value, bool):
+                raise ValueError('is not a number')
+            try:
+                return Decimal(str(value).strip())
+            except InvalidOperation:
+                raise ValueError('is not a number')
+    elif isinstance(kind, sqltypes.DateTime):
+        convert = datetime.fromisoformat
+    elif isinstance(kind, sqltypes.Date):
+        convert = date.fromisoformat
+    elif isinstance(kind, sqltypes.Time):
+        convert = clock.fromisoformat
+    elif isinstance(kind, sqltypes.Interval):
+        convert = lambda value: timedelta(seconds=float(value))
+    elif isinstance(kind, sqltypes.Uuid):
+        convert = (lambda value: uuid.UUID(str(value))) if kind.as_uuid else (lambda value: str(uuid.UUID(str(value))))
+    elif isinstance(kind, sqltypes.JSON):
+        # CSV fields hold the JSON document as text
+        convert = (lambda value: json.loads(value)) if file_format == 'csv' else (lambda value: value)
+    elif isinstance(kind, sqltypes.LargeBinary):
+        convert = lambda value: base64.b64decode(value, validate=True)
+    elif isinstance(kind, sqltypes.String):
+        length = kind.length
+        def convert(value):
+            if isinstance(value, (dict, list)):
+                raise ValueError('is not a string')
+            value = value if isinstance(value, str) else json.dumps(value)
+            if length and len(value) > length:
+                raise ValueError(f'is longer than {length} characters')
+            return value
+    else:
+        convert = lambda value: value
+    return convert
+
+required = [
+    name for name, column in columns.items()
+    if not column.nullable and column.default is None and column.server_default is None
+    and column is not table.autoincrement_column
+]
+# Empty CSV fields are NULL, except for strings
+empty_is_null = {name for name, column in columns.items() if not isinstance(column.type, sqltypes.String)}
+
+# Field name to (column, converter, empty is NULL), None for fields matching
+# no column. Worked out on first sight, records mostly repeat their fields
+fields = {}
+ignored = set()
+
+def plan(field):
+    name = mapping[field] or None if field in mapping else field if field in columns else None
+    if name is None:
+        ignored.add(field)
+        return None
+    return name, converter(columns[name]), file_format == 'csv' and name in empty_is_null
+
+def validate(record):
+    """The row for a record, and the errors that keep it out"""
+    if not isinstance(record, dict):
+        return None, ['is not an object']
+    row, errors = {}, []
+    for field, value in record.items():
+        try:
+            spec = fields[field]
+        except KeyError:
+            spec = fields[field] = plan(field)
+        if spec is None:
+            continue
+        name, convert, empty_null = spec
+        if value is None or empty_null and value == '':
+            row[name] = None
+            continue
+        try:
+            row[name] = convert(value)
+        except (ValueError, TypeError) as e:
+            errors.append(f'{name}: {e}')
+    for name in required:
+        if row.get(name) is None and not any(message.startswith(f'{name}:') for message in errors):
+            errors.append(f'{name}: is required')
+    return row, errors
+
+def lines(f, offset):
+    """(text, offset after it) for each line from offset on"""
+    f.seek(offset)
+    for raw in f:
+        offset += len(raw)
+        yield raw.decode('utf-8-sig' if offset == len(raw) else 'utf-8'), offset
+
+def ndjson_records(f, offset, line, header):
+    for text, end in lines(f, offset):
+        line += 1
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text), None, end
+        except ValueError as e:
+            yield line, text.rstrip('\\n'), f'invalid JSON: {e}', end
+
+def csv_records(f, offset, line, header):
+    position = [offset]
+
+    def feed():
+        for text, end in lines(f, offset):
+            position[0] = end
+            yield text
+
+    reader = csv.reader(feed())
+    if header is None:
+        header = next(reader, [])
+        csv_header[0] = header
+    for values in reader:
+        if not values:
+            continue
+        if len(values) != len(header):
+            yield line + reader.line_num, values, f'has {len(values)} fields, the header {len(header)}', position[0]
+        else:
+            yield line + reader.line_num, dict(zip(header, values)), None, position[0]
+
+def copy_value(value):
+    if value is None:
+        return '\\\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if isinstance(value, timedelta):
+        return f'{value.total_seconds()} seconds'
+    return value
+
+csv_header = [None]
+insert = table.insert()
+autoincrement = table.autoincrement_column
+
+with app.app_context():
+    engine = db.engine
+    dialect = engine.dialect.name
+    db.create_all()
+    CHECKPOINTS.create(engine, checkfirst=True)
+    # COPY on PostgreSQL, as db seed does. A COPY that fails raises the
+    # driver's own exceptions
+    use_copy = dialect == 'postgresql' and engine.dialect.driver in ('psycopg2', 'psycopg')
+    refusals = (IntegrityError, DataError)
+    if use_copy:
+        refusals += (engine.dialect.dbapi.IntegrityError, engine.dialect.dbapi.DataError)
+    quote = engine.dialect.identifier_preparer
+    key = hashlib.sha1(f'{os.path.abspath(path)}:{table.name}'.encode()).hexdigest()
+    where = CHECKPOINTS.c.key == key
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = hashlib.sha1(f.read(HEAD_BYTES)).hexdigest()
+
+    with engine.connect() as connection:
+        checkpoint = connection.execute(select(CHECKPOINTS).where(where)).first()
+        if checkpoint is not None and restart:
+            connection.execute(CHECKPOINTS.delete().where(where))
+            checkpoint = None
+        if checkpoint is not None and (checkpoint.head != head or checkpoint.offset > size):
+            raise SystemExit(
+                f'{path} changed since its import stopped at line {checkpoint.line:,}, '
+                'pass --restart to import it from the top'
+            )
+        if checkpoint is None:
+            connection.execute(CHECKPOINTS.insert().values(
+                key=key, path=os.path.abspath(path), head=head, header=None, offset=0, line=0, rows=0, rejected=0
+            ))
+            checkpoint = connection.execute(select(CHECKPOINTS).where(where)).first()
+        connection.commit()
+
+        state = {
+            'offset': checkpoint.offset, 'line': checkpoint.line,
+            'rows': checkpoint.rows, 'rejected': checkpoint.rejected
+        }
+        resumed_from = checkpoint.line
+        header = json.loads(checkpoint.header) if checkpoint.header else None
+        imported = 0
+        explicit_keys = False
+        started = time.perf_counter()
+
+        def progress():
+            elapsed = time.perf_counter() - started
+            rate = imported / elapsed if elapsed else 0
+            print(
+                f"\\r  line {state['line']:,}: {state['rows']:,} rows, {state['rejected']:,} rejected, "
+                f"{state['offset'] * 100 // max(size, 1)}% of {size / 1048576:,.1f} MiB, {rate:,.0f} rows/s",
+                end='', flush=True
+            )
+
+        def save_checkpoint():
+            connection.execute(CHECKPOINTS.update().where(where).values(
+                header=json.dumps(csv_header[0]) if csv_header[0] is not None else None, **state
+            ))
+
+        def insert_rows(rows):
+            # Records may leave out different fields, one statement per set
+            groups = {}
+            for row in rows:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            for names, group in groups.items():
+                if not use_copy:
+                    connection.execute(insert, group)
+                    continue
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, lineterminator='\\n')
+                writer.writerows([copy_value(row[name]) for name in names] for row in group)
+                sql = (
+                    f"COPY {quote.format_table(table)} ({', '.join(quote.quote(name) for name in names)}) "
+                    "FROM STDIN WITH (FORMAT csv, NULL '\\\\N')"
+                )
+                cursor = connection.connection.cursor()
+                try:
+                    if engine.dialect.driver == 'psycopg2':
+                        buffer.seek(0)
+                        cursor.copy_expert(sql, buffer)
+                    else:
+                        with cursor.copy(sql) as copy:
+                            copy.write(buffer.getvalue())
+                finally:
+                    cursor.close()
+
+        def commit(batch, refused, rejects):
+            """Insert a batch with its checkpoint, rejecting the rows the database refuses"""
+            global imported
+            # First, so that on SQLite the SAVEPOINTs below are inside the
+            # transaction pysqlite begins for it
+            save_checkpoint()
+            try:
+                insert_rows([row for line, record, row in batch])
+                failed = []
+            except refusals:
+                connection.rollback()
+                save_checkpoint()
+                failed = []
+                for line, record, row in batch:
+                    try:
+                        with connection.begin_nested():
+                            connection.execute(insert, row)
+                    except (IntegrityError, DataError) as e:
+                        failed.append((line, record, [str(e.orig).splitlines()[0]]))
+            state['rows'] += len(batch) - len(failed)
+            state['rejected'] += len(failed)
+            save_checkpoint()
+            connection.commit()
+            imported += len(batch) - len(failed)
+            for line, record, errors in refused + failed:
+                rejects.write(json.dumps({'line': line, 'errors': errors, 'record': record}, default=str) + '\\n')
+            rejects.flush()
+            if state['rejected'] - checkpoint.rejected > max_errors:
+                line, record, errors = (refused + failed)[-1]
+                print()
+                raise SystemExit(f"More than {max_errors} rejected rows, the last on line {line}: {'; '.join(errors)}")
+
+        records = csv_records if file_format == 'csv' else ndjson_records
+        with open(path, 'rb') as f, open(rejects_path, 'a' if state['offset'] else 'w', encoding='utf-8') as rejects:
+            csv_header[0] = header
+            batch, refused = [], []
+            for line, record, error, end in records(f, state['offset'], state['line'], header):
+                row, errors = (None, [error]) if error else validate(record)
+                if errors:
+                    refused.append((line, record, errors))
+                else:
+                    batch.append((line, record, row))
+                    explicit_keys = explicit_keys or autoincrement is not None and row.get(autoincrement.name) is not None
+                state['line'], state['offset'] = line, end
+                if len(batch) + len(refused) >= batch_size:
+                    state['rejected'] += len(refused)
+                    commit(batch, refused, rejects)
+                    batch, refused = [], []
+                    progress()
+            # Past blank lines at the end too
+            state['offset'] = size
+            state['rejected'] += len(refused)
+            commit(batch, refused, rejects)
+            progress()
+            print()
+
+        if explicit_keys and dialect == 'postgresql':
+            # Rows that came with their ids leave the sequence behind them
+            connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f"(SELECT COALESCE(MAX({quote.quote(autoincrement.name)}), 0) + 1 FROM {quote.format_table(table)}), false)"
+            ), {'table': quote.format_table(table), 'column': autoincrement.name})
+        connection.execute(CHECKPOINTS.delete().where(where))
+        connection.commit()
+        if not connection.execute(select(func.count()).select_from(CHECKPOINTS)).scalar():
+            connection.rollback()
+            CHECKPOINTS.drop(connection, checkfirst=True)
+            connection.commit()
+        seconds = time.perf_counter() - started
+
+with open(result_path, 'w', encoding='utf-8') as f:
+    json.dump({
+        'model': mapper.class_.__name__,
+        'table': table.name,
+        'database': dialect,
+        'rows': imported,
+        'total_rows': state['rows'],
+        'rejected': state['rejected'],
+        'lines': state['line'],
+        'resumed_from': resumed_from,
+        'ignored': sorted(ignored),
+        'seconds': seconds
+    }, f)
+'''
+
+def detect_format(path):
+    """'csv' or 'ndjson' from the file's extension, None when it tells neither"""
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+def import_file(python_cmd, path, model, file_format=None, batch_size=1000, mapping=None, restart=False,
+                max_errors=100, rejects=None, database_url=None):
+    """Import a CSV or NDJSON file into a model's table
+
+    An interrupted import resumes after its last committed batch, unless
+    restart is set. Rejected rows are written to rejects, FILE.rejects.ndjson
+    by default. The project's interpreter prints the progress. Returns its
+    report, or raises RuntimeError when it fails.
+    """
+    file_format = file_format or detect_format(path)
+    if file_format is None:
+        raise ValueError(f'can\'t tell the format of {path} from its extension, pass csv or ndjson')
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        result = subprocess.run(
+            [python_cmd, '-c', IMPORT_SCRIPT, path, model, file_format, str(batch_size), str(max_errors),
+             '1' if restart else '0', database_url or '', rejects or f'{path}.rejects.ndjson',
+             json.dumps(mapping or {}), result_path],
+            stderr=subprocess.PIPE, text=True, shell=False
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error')
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
@@ -0,0 +1,275 @@
+"""
+Memory profiling for Flite projects
+"""
+
+import json
+import os
+
+from .profiling import short_filename
+
+DEFAULT_MEMPROFILE_DIR = 'memprofile'
+
+# Runs run.py in the project's interpreter under tracemalloc, with Flask.run
+# patched to wrap the app in a middleware that measures the memory each
+# request leaves behind. Sampled requests also get a snapshot diff by line.
+# The whole process is snapshotted every interval and at exit.
+MEMPROFILE_RUN_SCRIPT = '''
+import atexit
+import collections
+import json
+import os
+import random
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.getcwd())
+
+directory, sample, interval, frames = sys.argv[1], float(sys.argv[2]), float(sys.argv[3]), int(sys.argv[4])
+paths = json.loads(sys.argv[5])
+sys.argv = ['run.py'] + sys.argv[sys.argv.index('--') + 1:]
+os.makedirs(directory, exist_ok=True)
+tracemalloc.start(frames)
+
+IGNORE = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+write_lock = threading.Lock()
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(IGNORE)
+
+IGNORED_FILES = {filter.filename_pattern for filter in IGNORE}
+
+def location(statistic):
+    frame = statistic.traceback[0]
+    return f'{frame.filename}:{frame.lineno}'
+
+def diff_lines(before, after, limit=20):
+    """[location, size, count] of the lines that grew between two snapshots
+
+    Snapshot.compare_to groups every trace of both snapshots in Python,
+    seconds with a framework loaded. Counting the raw trace tuples, whose
+    traceback starts at the most recent frame, leaves only the few traces
+    that changed to group. Those tuples are internal, (domain, size,
+    traceback) with a frame count added in 3.9, so any other layout falls
+    back to compare_to.
+    """
+    try:
+        counts = collections.Counter(after.traces._traces)
+        counts.subtract(collections.Counter(before.traces._traces))
+        lines = {}
+        for trace, count in counts.items():
+            domain, size, traceback = trace[:3]
+            if count and traceback:
+                filename, lineno = traceback[0]
+                if filename not in IGNORED_FILES:
+                    totals = lines.setdefault(f'{filename}:{lineno}', [0, 0])
+                    totals[0] += size * count
+                    totals[1] += count
+        grown = [[line, size, count] for line, (size, count) in lines.items() if size > 0]
+    except (AttributeError, TypeError, ValueError):
+        statistics = after.filter_traces(IGNORE).compare_to(before.filter_traces(IGNORE), 'lineno')
+        grown = [
+            [location(statistic), statistic.size_diff, statistic.count_diff]
+            for statistic in statistics if statistic.size_diff > 0
+        ]
+    return sorted(grown, key=lambda line: line[1], reverse=True)[:limit]
+
+def append(name, record):
+    with write_lock:
+        with open(os.path.join(directory, name), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\\n')
+
+def rss():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class MemoryProfilerMiddleware:
+    """Measure the memory each request leaves allocated, per route"""
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+        # 'METHOD /rule' -> [requests, bytes retained]
+        self.routes = {}
+        self.lock = threading.Lock()
+        # One snapshot diff at a time, they are expensive
+        self.snapshot_lock = threading.Lock()
+
+    def route(self, environ):
+        try:
+            rule = self.app.url_map.bind_to_environ(environ).match(return_rule=True)[0].rule
+        except Exception:
+            rule = '(unmatched)'
+        return f"{environ.get('REQUEST_METHOD')} {rule}"
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if paths and not any(path.startswith(prefix) for prefix in paths):
+            return self.wsgi_app(environ, start_response)
+
+        key = self.route(environ)
+        sampled = random.random() < sample and self.snapshot_lock.acquire(blocking=False)
+        before = tracemalloc.take_snapshot() if sampled else None
+        status = []
+        def capture_status(status_line, headers, exc_info=None):
+            status.append(status_line)
+            return start_response(status_line, headers, exc_info)
+
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            iterable = self.wsgi_app(environ, capture_status)
+            try:
+                body = list(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        finally:
+            retained = tracemalloc.get_traced_memory()[0] - start
+            with self.lock:
+                totals = self.routes.setdefault(key, [0, 0])
+                totals[0] += 1
+                totals[1] += retained
+            if sampled:
+                try:
+                    lines = diff_lines(before, tracemalloc.take_snapshot())
+                    append('requests.ndjson', {
+                        'ts': time.time(),
+                        'route': key,
+                        'status': int(status[0].split(' ', 1)[0]) if status else None,
+                        'retained': retained,
+                        'lines': lines
+                    })
+                except Exception as e:
+                    # The profiler never fails the request it measures
+                    print(f'memprofile: could not record {key}: {e}', file=sys.stderr)
+                finally:
+                    self.snapshot_lock.release()
+        return body
+
+middleware = None
+
+def write_snapshot():
+    current, peak = tracemalloc.get_traced_memory()
+    statistics = take_snapshot().statistics('lineno')[:500]
+    with middleware.lock:
+        routes = {key: list(totals) for key, totals in middleware.routes.items()}
+    append('snapshots.ndjson', {
+        'ts': time.time(),
+        'traced': current,
+        'peak': peak,
+        'rss': rss(),
+        'routes': routes,
+        'lines': {location(statistic): [statistic.size, statistic.count] for statistic in statistics}
+    })
+
+def snapshot_every_interval():
+    while True:
+        time.sleep(interval)
+        write_snapshot()
+
+from flask import Flask
+
+original_run = Flask.run
+
+def profiled_run(self, *args, **kwargs):
+    global middleware
+    middleware = MemoryProfilerMiddleware(self.wsgi_app, self)
+    self.wsgi_app = middleware
+    # The reloader would restart run.py without tracemalloc
+    kwargs['use_reloader'] = False
+    write_snapshot()
+    atexit.register(write_snapshot)
+    threading.Thread(target=snapshot_every_interval, name='memprofile', daemon=True).start()
+    return original_run(self, *args, **kwargs)
+
+Flask.run = profiled_run
+runpy.run_path('run.py', run_name='__main__')
+'''
+
+def memprofile_run_command(python_cmd, run_args, directory=DEFAULT_MEMPROFILE_DIR, sample=0.01, interval=60.0, frames=1, paths=()):
+    """The command running run.py under tracemalloc with per-route accounting"""
+    return [
+        python_cmd, '-c', MEMPROFILE_RUN_SCRIPT, directory, str(sample), str(interval), str(frames),
+        json.dumps(list(paths)), '--'
+    ] + list(run_args)
+
+def _read_ndjson(path):
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Cut short when the process was killed
+                continue
+    return records
+
+def short_location(location):
+    """file:line with the file shortened like in profile reports"""
+    filename, line = location.rsplit(':', 1)
+    return f'{short_filename(filename)}:{line}'
+
+def memory_report(directory=DEFAULT_MEMPROFILE_DIR, top=10):
+    """Summarize a memprofile directory
+
+    Returns the process growth between the first and last snapshot, the
+    routes by memory retained, the lines allocating the most live memory
+    now, the lines that grew in every snapshot (suspected leaks), and the
+    lines that sampled requests left allocated most often. None when the
+    directory has no snapshot.
+    """
+    snapshots = sorted(_read_ndjson(os.path.join(directory, 'snapshots.ndjson')), key=lambda s: s['ts'])
+    if not snapshots:
+        return None
+    first, last = snapshots[0], snapshots[-1]
+
+    routes = [
+        {'route': key, 'requests': requests, 'retained': retained, 'per_request': retained / requests if requests else 0}
+        for key, (requests, retained) in last['routes'].items()
+    ]
+    routes.sort(key=lambda route: route['retained'], reverse=True)
+
+    allocators = sorted(last['lines'].items(), key=lambda item: item[1][0], reverse=True)[:top]
+    allocators = [{'line': short_location(line), 'size': size, 'count': count} for line, (size, count) in allocators]
+
+    # Growing in every snapshot from its first appearance on
+    leaks = []
+    if len(snapshots) >= 3:
+        for line in last['lines']:
+            sizes = [snapshot['lines'][line][0] for snapshot in snapshots if line in snapshot['lines']]
+            if len(sizes) >= 3 and all(b >= a for a, b in zip(sizes, sizes[1:])) and sizes[-1] > sizes[0]:
+                leaks.append({'line': short_location(line), 'growth': sizes[-1] - sizes[0], 'size': sizes[-1], 'snapshots': len(sizes)})
+        leaks.sort(key=lambda leak: leak['growth'], reverse=True)
+
+    retained_lines = {}
+    for request in _read_ndjson(os.path.join(directory, 'requests.ndjson')):
+        for line, size, count in request['lines']:
+            entry = retained_lines.setdefault(line, {'line': short_location(line), 'size': 0, 'requests': 0, 'routes': {}})
+            entry['size'] += size
+            entry['requests'] += 1
+            entry['routes'][request['route']] = entry['routes'].get(request['route'], 0) + 1
+    retained_lines = sorted(retained_lines.values(), key=lambda entry: entry['size'], reverse=True)[:top]
+
+    return {
+        'snapshots': len(snapshots),
+        'seconds': last['ts'] - first['ts'],
+        'traced': (first['traced'], last['traced']),
+        'rss': (first['rss'], last['rss']),
+        'peak': last['peak'],
+        'routes': routes[:top],
+        'allocators': allocators,
+        'leaks': leaks[:top],
+        'retained_lines': retained_lines
+    }
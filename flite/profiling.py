@@ -0,0 +1,176 @@
+"""
+Request profiling for Flite projects
+"""
+
+import json
+import os
+import pstats
+import re
+
+DEFAULT_PROFILE_DIR = 'profiles'
+
+_STDLIB = re.compile(r'lib[\\/]python\d+\.\d+[\\/]')
+
+# Runs run.py in the project's interpreter with Flask.run patched to wrap
+# the app in a profiling middleware. The reloader is turned off: it would
+# restart run.py in a child process without the patch.
+PROFILE_RUN_SCRIPT = '''
+import cProfile
+import json
+import os
+import random
+import runpy
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+directory, sample, min_ms, paths = sys.argv[1], float(sys.argv[2]), float(sys.argv[3]), json.loads(sys.argv[4])
+sys.argv = ['run.py'] + sys.argv[sys.argv.index('--') + 1:]
+os.makedirs(directory, exist_ok=True)
+
+class ProfilerMiddleware:
+    """Profile sampled requests and write one .prof file per request"""
+
+    def __init__(self, wsgi_app, app):
+        self.wsgi_app = wsgi_app
+        self.app = app
+        self.count = 0
+        # One profiler at a time: Python 3.12+ refuses concurrent ones
+        self.lock = threading.Lock()
+        self.index_lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if paths and not any(path.startswith(prefix) for prefix in paths):
+            return self.wsgi_app(environ, start_response)
+        if random.random() >= sample or not self.lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        status = []
+        def capture_status(status_line, headers, exc_info=None):
+            status.append(status_line)
+            return start_response(status_line, headers, exc_info)
+
+        def handle():
+            # The body is produced inside the profile too
+            iterable = self.wsgi_app(environ, capture_status)
+            try:
+                return list(iterable)
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+
+        try:
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            body = profile.runcall(handle)
+            ms = (time.perf_counter() - start) * 1000
+        finally:
+            self.lock.release()
+        if ms >= min_ms:
+            self.save(profile, environ, status[0] if status else '', ms)
+        return body
+
+    def save(self, profile, environ, status, ms):
+        try:
+            rule = self.app.url_map.bind_to_environ(environ).match(return_rule=True)[0].rule
+        except Exception:
+            rule = '(unmatched)'
+        with self.index_lock:
+            self.count += 1
+            name = f'{int(time.time() * 1000)}-{os.getpid()}-{self.count}.prof'
+            profile.dump_stats(os.path.join(directory, name))
+            with open(os.path.join(directory, 'index.ndjson'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({
+                    'file': name,
+                    'method': environ.get('REQUEST_METHOD'),
+                    'path': environ.get('PATH_INFO'),
+                    'route': rule,
+                    'status': int(status.split(' ', 1)[0]) if status else None,
+                    'ms': round(ms, 2)
+                }) + '\\n')
+
+from flask import Flask
+
+original_run = Flask.run
+
+def profiled_run(self, *args, **kwargs):
+    self.wsgi_app = ProfilerMiddleware(self.wsgi_app, self)
+    kwargs['use_reloader'] = False
+    return original_run(self, *args, **kwargs)
+
+Flask.run = profiled_run
+runpy.run_path('run.py', run_name='__main__')
+'''
+
+def profile_run_command(python_cmd, run_args, directory=DEFAULT_PROFILE_DIR, sample=1.0, min_ms=0.0, paths=()):
+    """The command running run.py with per-request profiling"""
+    return [python_cmd, '-c', PROFILE_RUN_SCRIPT, directory, str(sample), str(min_ms), json.dumps(list(paths)), '--'] + list(run_args)
+
+def read_profile_index(directory):
+    """The captured requests whose .prof file still exists"""
+    index_path = os.path.join(directory, 'index.ndjson')
+    if not os.path.exists(index_path):
+        return []
+    entries = []
+    with open(index_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if os.path.exists(os.path.join(directory, entry['file'])):
+                entries.append(entry)
+    return entries
+
+def short_filename(filename):
+    """The filename without its site-packages or stdlib prefix, or relative to the project"""
+    marker = f'site-packages{os.sep}'
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    if _STDLIB.search(filename):
+        return _STDLIB.split(filename, 1)[1]
+    if os.path.abspath(filename).startswith(os.getcwd() + os.sep):
+        return os.path.relpath(filename)
+    return filename
+
+def _function_label(function):
+    filename, line, name = function
+    if filename == '~':
+        # Built-ins have no file
+        return name
+    return f'{short_filename(filename)}:{line}({name})'
+
+def profile_top(directory=DEFAULT_PROFILE_DIR, top=10, sort='tottime', route=None):
+    """Merge the profiles of each route and rank its hottest functions
+
+    Returns [{'route', 'requests', 'total_ms', 'functions'}], the routes
+    with the most time first. Each function is (label, calls, tottime,
+    cumtime), times in seconds summed over the route's requests.
+    """
+    groups = {}
+    for entry in read_profile_index(directory):
+        key = f"{entry['method']} {entry['route']}"
+        if route is not None and route not in (key, entry['route']):
+            continue
+        groups.setdefault(key, []).append(entry)
+
+    column = {'calls': 1, 'tottime': 2, 'cumtime': 3}[sort]
+    summary = []
+    for key, entries in groups.items():
+        stats = pstats.Stats(*(os.path.join(directory, entry['file']) for entry in entries))
+        functions = [
+            (_function_label(function), calls, tottime, cumtime)
+            for function, (primitive_calls, calls, tottime, cumtime, callers) in stats.stats.items()
+        ]
+        functions.sort(key=lambda function: function[column], reverse=True)
+        summary.append({
+            'route': key,
+            'requests': len(entries),
+            'total_ms': sum(entry['ms'] for entry in entries),
+            'functions': functions[:top]
+        })
+    summary.sort(key=lambda group: group['total_ms'], reverse=True)
+    return summary
@@ -0,0 +1,300 @@
+"""
+Synthetic data for Flite projects
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+
+# Runs inside the project's interpreter. Makes up rows for one model from
+# its column types and loads them in batches: COPY on PostgreSQL (psycopg2
+# or psycopg), one transaction with bulk-load pragmas on SQLite, and
+# executemany with a commit per batch elsewhere. Rows come from a
+# random.Random seeded with the given seed, so the same seed on the same
+# table gives the same rows.
+SEED_SCRIPT = '''
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, time as clock, timedelta, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import PrimaryKeyConstraint, UniqueConstraint, func, select
+from sqlalchemy import types as sqltypes
+
+model_name, rows, seed, batch_size, database_url, result_path = (
+    sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]), sys.argv[5], sys.argv[6]
+)
+
+import config as project_config
+
+class SeedConfig(project_config.Config):
+    SQLALCHEMY_DATABASE_URI = database_url or getattr(project_config.Config, 'SQLALCHEMY_DATABASE_URI', None)
+    TESTING = False
+    METRICS_ENABLED = False
+    SLOW_QUERY_MS = None
+    QUERY_BUDGET_ENABLED = False
+
+from app import create_app
+
+app = create_app(SeedConfig)
+db = app.extensions.get('sqlalchemy')
+if db is None or not SeedConfig.SQLALCHEMY_DATABASE_URI:
+    raise SystemExit('The project has no database')
+
+WORDS = (
+    'amber', 'brook', 'cedar', 'delta', 'ember', 'fable', 'grove', 'harbor', 'iris', 'juniper', 'kestrel',
+    'lumen', 'meadow', 'nimbus', 'orchid', 'pebble', 'quartz', 'river', 'sable', 'thistle', 'umber',
+    'velvet', 'willow', 'yarrow', 'zephyr', 'summit', 'lantern', 'copper', 'hollow', 'marble'
+)
+# Paragraphs are slices of this, random.choices() per word is slow
+CORPUS = random.Random(0).choices(WORDS, k=4096)
+# Dates go back two years from here, not from today, to stay reproducible
+NOW = datetime(2025, 1, 1)
+SPAN = 2 * 365 * 24 * 3600
+# Fraction of NULLs in nullable columns
+NULLS = 0.1
+# Foreign keys point at one of this many rows of their table
+MAX_PARENT_KEYS = 100000
+
+def unique_columns(table):
+    found = {column.name for column in table.columns if column.unique}
+    for constraint in table.constraints:
+        if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint)) and len(constraint.columns) == 1:
+            found.update(column.name for column in constraint.columns)
+    for index in table.indexes:
+        if index.unique and len(index.columns) == 1:
+            found.update(column.name for column in index.columns)
+    return found
+
+def paragraph(rng, shortest, longest):
+    start = int(rng.random() * (len(CORPUS) - longest))
+    return ' '.join(CORPUS[start:start + shortest + int(rng.random() * (longest - shortest + 1))])
+
+def value_maker(column, unique, parent_keys):
+    """A function of (rng, n) for the values of column in row number n"""
+    kind = column.type
+    # int(rng.random() * n) rather than randrange(n), which is several
+    # times slower and runs for every value
+    if column.foreign_keys:
+        if not parent_keys:
+            return lambda rng, n: None
+        return lambda rng, n: parent_keys[int(rng.random() * len(parent_keys))]
+    if isinstance(kind, sqltypes.Boolean):
+        return lambda rng, n: rng.random() < 0.5
+    if isinstance(kind, sqltypes.Enum):
+        return lambda rng, n: kind.enums[int(rng.random() * len(kind.enums))]
+    if isinstance(kind, sqltypes.Integer):
+        if unique:
+            return lambda rng, n: n
+        top = 32768 if isinstance(kind, sqltypes.SmallInteger) else 1000000
+        return lambda rng, n: int(rng.random() * top)
+    if isinstance(kind, sqltypes.Float):
+        return lambda rng, n: round(rng.random() * 1000, 2)
+    if isinstance(kind, sqltypes.Numeric):
+        scale = kind.scale if kind.scale is not None else 2
+        top = 10 ** (min((kind.precision or 10) - scale, 6) + scale)
+        return lambda rng, n: Decimal(int(rng.random() * top)).scaleb(-scale)
+    if isinstance(kind, sqltypes.DateTime):
+        if kind.timezone:
+            return lambda rng, n: (NOW - timedelta(seconds=int(rng.random() * SPAN))).replace(tzinfo=timezone.utc)
+        return lambda rng, n: NOW - timedelta(seconds=int(rng.random() * SPAN))
+    if isinstance(kind, sqltypes.Date):
+        return lambda rng, n: (NOW - timedelta(seconds=int(rng.random() * SPAN))).date()
+    if isinstance(kind, sqltypes.Time):
+        return lambda rng, n: clock(*divmod(int(rng.random() * 1440), 60), int(rng.random() * 60))
+    if isinstance(kind, sqltypes.Interval):
+        return lambda rng, n: timedelta(seconds=int(rng.random() * 86400))
+    if isinstance(kind, sqltypes.Uuid):
+        convert = (lambda value: value) if kind.as_uuid else str
+        return lambda rng, n: convert(uuid.UUID(int=rng.getrandbits(128), version=4))
+    if isinstance(kind, sqltypes.JSON):
+        return lambda rng, n: {'n': n, 'tag': rng.choice(WORDS)}
+    if isinstance(kind, sqltypes.LargeBinary):
+        # Random.randbytes() is Python 3.9+
+        return lambda rng, n: rng.getrandbits(128).to_bytes(16, 'big')
+    if isinstance(kind, sqltypes.String):
+        length = kind.length
+        if length is None:
+            # Text, a paragraph of 5 to 40 words
+            return lambda rng, n: paragraph(rng, 5, 40).capitalize() + '.'
+        if 'email' in column.name:
+            make = lambda rng, n: f'{CORPUS[int(rng.random() * len(CORPUS))]}.{n}@example.com'
+        elif unique:
+            make = lambda rng, n: f'{CORPUS[int(rng.random() * len(CORPUS))]}-{n}'
+        else:
+            make = lambda rng, n: paragraph(rng, 1, 3).title()
+
+        def fit(rng, n):
+            value = make(rng, n)
+            if len(value) <= length:
+                return value
+            # Cut short, a unique value keeps its number
+            return str(n)[-length:] if unique else value[:length]
+        return fit
+    if column.nullable:
+        return lambda rng, n: None
+    raise SystemExit(f"No values can be made up for {column.table.name}.{column.name} of type {kind}")
+
+def with_nulls(make):
+    return lambda rng, n: None if rng.random() < NULLS else make(rng, n)
+
+def copy_value(value):
+    if value is None:
+        return '\\\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+mappers = list(db.Model.registry.mappers)
+mapper = next((m for m in mappers if m.class_.__name__ == model_name), None)
+mapper = mapper or next((m for m in mappers if m.local_table.name == model_name), None)
+if mapper is None:
+    raise SystemExit(f"No model called {model_name}, the models are {', '.join(sorted(m.class_.__name__ for m in mappers))}")
+table = mapper.local_table
+
+with app.app_context():
+    engine = db.engine
+    dialect = engine.dialect.name
+    db.create_all()
+    with engine.connect() as connection:
+        existing = connection.execute(select(func.count()).select_from(table)).scalar()
+        unique = unique_columns(table)
+        columns, makers = [], []
+        for column in table.columns:
+            if column is table.autoincrement_column or column.computed is not None:
+                continue
+            parent_keys = None
+            if column.foreign_keys:
+                target = next(iter(column.foreign_keys)).column
+                parent_keys = connection.execute(select(target).order_by(target).limit(MAX_PARENT_KEYS)).scalars().all()
+                if not parent_keys and not column.nullable:
+                    raise SystemExit(f"{target.table.name} is empty, seed it first")
+            make = value_maker(column, column.name in unique, parent_keys)
+            if column.nullable and column.name not in unique and not column.foreign_keys:
+                make = with_nulls(make)
+            columns.append(column)
+            makers.append(make)
+        connection.rollback()
+
+        rng = random.Random(seed)
+
+        def batches():
+            # Numbers continue after the rows already there, unique values too
+            for start in range(existing, existing + rows, batch_size):
+                yield [
+                    tuple(make(rng, n) for make in makers)
+                    for n in range(start + 1, min(start + batch_size, existing + rows) + 1)
+                ]
+
+        started = time.perf_counter()
+        done = 0
+
+        def progress(count):
+            elapsed = time.perf_counter() - started
+            rate = count / elapsed if elapsed else 0
+            print(f'\\r  {count:,}/{rows:,} rows ({count * 100 // max(rows, 1)}%), {rate:,.0f} rows/s', end='', flush=True)
+
+        names = [column.name for column in columns]
+        insert = table.insert()
+        if dialect == 'postgresql' and engine.dialect.driver in ('psycopg2', 'psycopg'):
+            method = 'COPY'
+            quote = engine.dialect.identifier_preparer
+            sql = (
+                f"COPY {quote.format_table(table)} ({', '.join(quote.quote(name) for name in names)}) "
+                "FROM STDIN WITH (FORMAT csv, NULL '\\\\N')"
+            )
+            cursor = connection.connection.cursor()
+            for batch in batches():
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, lineterminator='\\n')
+                writer.writerows([copy_value(value) for value in row] for row in batch)
+                buffer.seek(0)
+                if engine.dialect.driver == 'psycopg2':
+                    cursor.copy_expert(sql, buffer)
+                else:
+                    with cursor.copy(sql) as copy:
+                        copy.write(buffer.getvalue())
+                connection.connection.commit()
+                done += len(batch)
+                progress(done)
+            cursor.close()
+            # Fresh planner statistics for the load test that follows
+            connection.exec_driver_sql(f'ANALYZE {quote.format_table(table)}')
+            connection.commit()
+        elif dialect == 'sqlite':
+            method = 'executemany in one transaction'
+            journal_mode = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+            synchronous = connection.exec_driver_sql('PRAGMA synchronous').scalar()
+            # No fsync and the rollback journal in memory: a crash can lose
+            # the load, not the rows already there. WAL is left as it is,
+            # leaving it needs the database to itself
+            connection.exec_driver_sql('PRAGMA synchronous = OFF')
+            if journal_mode != 'wal':
+                connection.exec_driver_sql('PRAGMA journal_mode = MEMORY')
+            connection.exec_driver_sql('PRAGMA cache_size = -262144')
+            connection.exec_driver_sql('PRAGMA temp_store = MEMORY')
+            try:
+                for batch in batches():
+                    connection.execute(insert, [dict(zip(names, row)) for row in batch])
+                    done += len(batch)
+                    progress(done)
+                connection.commit()
+            finally:
+                connection.rollback()
+                connection.exec_driver_sql(f'PRAGMA journal_mode = {journal_mode}')
+                connection.exec_driver_sql(f'PRAGMA synchronous = {synchronous}')
+                connection.commit()
+        else:
+            method = 'executemany'
+            for batch in batches():
+                connection.execute(insert, [dict(zip(names, row)) for row in batch])
+                connection.commit()
+                done += len(batch)
+                progress(done)
+        seconds = time.perf_counter() - started
+        print()
+
+with open(result_path, 'w', encoding='utf-8') as f:
+    json.dump({
+        'model': mapper.class_.__name__,
+        'table': table.name,
+        'database': dialect,
+        'method': method,
+        'existing': existing,
+        'rows': done,
+        'seconds': seconds
+    }, f)
+'''
+
+def seed_model(python_cmd, model, rows, seed=0, batch_size=10000, database_url=None):
+    """Add rows of synthetic data to a model's table
+
+    The project's interpreter prints the progress. Returns its report, or
+    raises RuntimeError when it fails.
+    """
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        result = subprocess.run(
+            [python_cmd, '-c', SEED_SCRIPT, model, str(rows), str(seed), str(batch_size), database_url or '', result_path],
+            stderr=subprocess.PIPE, text=True, shell=False
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'unknown error')
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
@@ -162,8 +162,13 @@ class SimpleInteractiveMode:
         return 'none'
     
     def get_additional_features(self):
-        """Simplified - no additional features for now"""
-        return []
+        """Get the optional extras to generate"""
+        options = {
+            'yes': 'Yes - Route microbenchmarks (benchmarks/)',
+            'no': 'No - Skip benchmarks'
+        }
+        choice = self.show_menu("Generate a route benchmark suite?", options)
+        return ['tests'] if choice == 'yes' else []
     
     def get_project_configuration(self):
         """Get complete project configuration interactively"""
@@ -221,7 +226,8 @@ class SimpleInteractiveMode:
         summary_content = f"""Project name: {UI.highlight(config['project_name'])}
 Template type: {UI.highlight(config['template'])}
 Database: {UI.highlight(config['database'])}
-Frontend: {UI.highlight(config['frontend'])}"""
+Frontend: {UI.highlight(config['frontend'])}
+Benchmarks: {UI.highlight('yes' if config['tests'] else 'no')}"""
         
         print(UI.box(summary_content, "Configuration Summary", 50))
     
@@ -0,0 +1,94 @@
+"""
+Slow-query log summaries for Flite projects
+"""
+
+import glob
+import json
+import os
+import re
+
+# Where the generated app writes it unless SLOW_QUERY_LOG says otherwise
+DEFAULT_SLOWLOG = os.path.join('instance', 'slow_queries.ndjson')
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?')
+_PLACEHOLDER_LISTS = re.compile(r'\?(?:\s*,\s*\?)+')
+
+def normalize_statement(statement):
+    """Replace literals and bind parameters with ?, and IN lists with one"""
+    normalized = ' '.join(statement.split())
+    normalized = _PLACEHOLDERS.sub('?', normalized)
+    normalized = _LITERALS.sub('?', normalized)
+    return _PLACEHOLDER_LISTS.sub('?, ...', normalized)
+
+def _rotated(path):
+    backups = sorted(
+        (name for name in glob.glob(f'{glob.escape(path)}.*') if name.rsplit('.', 1)[1].isdigit()),
+        key=lambda name: int(name.rsplit('.', 1)[1]),
+        reverse=True
+    )
+    return backups + ([path] if os.path.exists(path) else [])
+
+def slowlog_files(path):
+    """The log and its rotated backups, oldest first
+
+    The generated app writes one file per process, with the pid before
+    the extension (slow_queries.1234.ndjson for slow_queries.ndjson), so
+    those are read too, each with its own backups.
+    """
+    root, extension = os.path.splitext(path)
+    pattern = re.compile(re.escape(root) + r'\.\d+' + re.escape(extension) + '$')
+    per_process = sorted(
+        name for name in glob.glob(f'{glob.escape(root)}.*{glob.escape(extension)}') if pattern.match(name)
+    )
+    files = _rotated(path)
+    for name in per_process:
+        files += _rotated(name)
+    return files
+
+def read_slowlog(paths):
+    """Yield the records of NDJSON files, skipping lines that don't parse"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash or a concurrent rotation
+                    continue
+                if isinstance(record, dict) and 'statement' in record and 'ms' in record:
+                    yield record
+
+def _percentile(values, fraction):
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+def aggregate_slowlog(records, sort='total'):
+    """Group records by normalized statement, slowest group first"""
+    groups = {}
+    for record in records:
+        key = normalize_statement(record['statement'])
+        group = groups.setdefault(key, {'statement': key, 'durations': [], 'routes': {}, 'plan': None, 'slowest': -1.0, 'last_seen': None})
+        group['durations'].append(record['ms'])
+        route = record.get('route') or '(outside a request)'
+        group['routes'][route] = group['routes'].get(route, 0) + 1
+        if record['ms'] > group['slowest']:
+            group['slowest'] = record['ms']
+            group['plan'] = record.get('plan')
+        group['last_seen'] = max(filter(None, (group['last_seen'], record.get('ts'))), default=None)
+
+    summary = []
+    for group in groups.values():
+        durations = sorted(group.pop('durations'))
+        group.pop('slowest')
+        group.update({
+            'count': len(durations),
+            'total_ms': sum(durations),
+            'mean_ms': sum(durations) / len(durations),
+            'p95_ms': _percentile(durations, 0.95),
+            'max_ms': durations[-1],
+            'routes': sorted(group['routes'].items(), key=lambda item: item[1], reverse=True)
+        })
+        summary.append(group)
+    summary.sort(key=lambda group: group[f'{sort}_ms' if sort != 'count' else 'count'], reverse=True)
+    return summary
@@ -0,0 +1,132 @@
+"""
+Startup profiling for Flite projects
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+# Runs inside the project's interpreter under -X importtime. Times the
+# import of the app package, each line of create_app (calls made from a
+# line are charged to it), and the first request through the test client.
+STARTUP_SCRIPT = '''
+import json
+import linecache
+import os
+import sys
+import time
+
+started = time.perf_counter()
+sys.path.insert(0, os.getcwd())
+result_path = sys.argv[1]
+
+import app as app_package
+imported = time.perf_counter()
+
+create_app = app_package.create_app
+code = create_app.__code__
+steps = {}
+last = [None, 0.0]
+
+def trace_lines(frame, event, arg):
+    now = time.perf_counter()
+    if last[0] is not None:
+        steps[last[0]] = steps.get(last[0], 0.0) + now - last[1]
+    last[0] = frame.f_lineno if event == 'line' else None
+    last[1] = time.perf_counter()
+    return trace_lines
+
+def trace_calls(frame, event, arg):
+    if frame.f_code is code:
+        last[1] = time.perf_counter()
+        return trace_lines
+    return None
+
+sys.settrace(trace_calls)
+try:
+    app = create_app()
+finally:
+    sys.settrace(None)
+created = time.perf_counter()
+
+with app.test_client() as client:
+    status = client.get('/').status_code
+responded = time.perf_counter()
+
+filename = code.co_filename
+with open(result_path, 'w', encoding='utf-8') as f:
+    json.dump({
+        'import_app': imported - started,
+        'create_app': created - imported,
+        'first_request': responded - created,
+        'first_status': status,
+        'steps': [
+            {
+                'location': f'{os.path.relpath(filename)}:{line}',
+                'source': linecache.getline(filename, line).strip(),
+                'seconds': seconds
+            }
+            for line, seconds in steps.items()
+        ]
+    }, f)
+'''
+
+def parse_importtime(output):
+    """Parse -X importtime lines into (name, self_us, cumulative_us, depth)"""
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # The header line
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+def startup_report(python_cmd):
+    """Run the app under -X importtime and collect startup timings
+
+    Raises RuntimeError when the app could not be started.
+    """
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        start = time.perf_counter()
+        result = subprocess.run(
+            [python_cmd, '-X', 'importtime', '-c', STARTUP_SCRIPT, result_path],
+            capture_output=True, text=True, shell=False
+        )
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            errors = [line for line in result.stderr.splitlines() if not line.startswith('import time:')]
+            raise RuntimeError(errors[-1] if errors else 'unknown error')
+        with open(result_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    finally:
+        os.remove(result_path)
+
+    report['process'] = elapsed
+    report['imports'] = parse_importtime(result.stderr)
+    report['steps'].sort(key=lambda step: step['seconds'], reverse=True)
+    return report
+
+def slowest_imports(imports, top=15):
+    """Rank top-level packages by cumulative time and modules by their own time"""
+    packages = {}
+    for name, self_us, cumulative_us, depth in imports:
+        # The project's own package is the total, not a suspect
+        if name == 'app' or name.startswith('app.'):
+            continue
+        # A package can show up nested under whatever imported it first
+        root = name.split('.')[0]
+        if root == name:
+            packages[root] = max(packages.get(root, 0), cumulative_us)
+    by_package = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    by_module = sorted(((name, self_us) for name, self_us, cumulative_us, depth in imports),
+                       key=lambda item: item[1], reverse=True)[:top]
+    return by_package, by_module
@@ -22,6 +22,14 @@ def print_warning(message):
     """Print warning message with styling"""
     print(UI.warning(message))
 
+def get_venv_python():
+    """Get the project's .venv Python, or None when there is no .venv"""
+    if os.name == 'nt':  # Windows
+        python_cmd = os.path.join('.venv', 'Scripts', 'python.exe')
+    else:  # Unix/Linux/Mac
+        python_cmd = os.path.join('.venv', 'bin', 'python')
+    return python_cmd if os.path.exists(python_cmd) else None
+
 def ensure_directory(path):
     """Ensure directory exists, create if it doesn't"""
     os.makedirs(path, exist_ok=True)
@@ -0,0 +1,78 @@
+"""
+Tests for the index advisor
+"""
+import os
+import pytest
+import sys
+from flite.analyze import alembic_head, analyze_indexes, write_index_migration
+from flite.generator import ProjectGenerator
+from .test_base import TestBase
+
+NAMED_ROUTE = '''
+@api_bp.route('/examples/named/<name>', methods=['GET'])
+def examples_named(name):
+    examples = ExampleModel.query.filter_by(name=name).order_by(ExampleModel.created_at.desc()).all()
+    return respond([example.to_dict() for example in examples])
+'''
+
+def _revision(directory, revision, down_revision):
+    with open(os.path.join(directory, f'{revision}_step.py'), 'w', encoding='utf-8') as f:
+        f.write(f"revision = '{revision}'\ndown_revision = {down_revision!r}\n")
+
+class TestAnalyze(TestBase):
+    """Test index suggestions and migrations"""
+    
+    def test_analyze_suggests_filter_and_sort_index(self):
+        """Test a filtered, sorted list gets an index and primary key lookups don't"""
+        generator = ProjectGenerator()
+        generator._create_directory_structure()
+        generator._generate_files('test_analyze', 'api', 'sqlite', False, True, 'none')
+        with open('app/api_routes.py', 'a', encoding='utf-8') as f:
+            f.write(NAMED_ROUTE)
+        
+        report = analyze_indexes(sys.executable, rows=500, paths=['/api/examples/named/name-5'])
+        
+        assert {'path': '/api/examples/1', 'status': 200} in report['routes']
+        assert [s['columns'] for s in report['suggestions']] == [['name', 'created_at']]
+        statement = report['suggestions'][0]['statements'][0]
+        assert 'GET /api/examples/named/name-5' in statement['routes']
+        assert any(step.startswith('SCAN example_model') for step in statement['plan_before'])
+        assert 'USING INDEX ix_example_model_name_created_at' in ' '.join(statement['plan_after'])
+        assert report['unit'] == 'ms'
+    
+    def test_analyze_without_app(self):
+        """Test a directory without an app is reported as an error"""
+        with pytest.raises(RuntimeError):
+            analyze_indexes(sys.executable, rows=10)
+    
+    def test_alembic_head(self):
+        """Test the head follows down_revision, including merges"""
+        os.makedirs('versions')
+        assert alembic_head('versions') is None
+        
+        _revision('versions', 'aaa', None)
+        _revision('versions', 'bbb', 'aaa')
+        _revision('versions', 'ccc', 'aaa')
+        with pytest.raises(RuntimeError):
+            alembic_head('versions')
+        
+        _revision('versions', 'ddd', ('bbb', 'ccc'))
+        assert alembic_head('versions') == 'ddd'
+    
+    def test_write_index_migration(self):
+        """Test the migration revises the head and drops what it creates"""
+        os.makedirs(os.path.join('migrations', 'versions'))
+        _revision(os.path.join('migrations', 'versions'), 'aaa', None)
+        suggestion = {'name': 'ix_example_model_name', 'table': 'example_model', 'columns': ['name']}
+        
+        path = write_index_migration([suggestion])
+        
+        self.assert_file_contains(path, "down_revision = 'aaa'")
+        self.assert_file_contains(path, "op.create_index('ix_example_model_name', 'example_model', ['name'], unique=False)")
+        self.assert_file_contains(path, "op.drop_index('ix_example_model_name', table_name='example_model')")
+        assert alembic_head(os.path.join('migrations', 'versions')) != 'aaa'
+    
+    def test_write_index_migration_without_migrations(self):
+        """Test a project without flask db init is reported"""
+        with pytest.raises(RuntimeError):
+            write_index_migration([])
@@ -0,0 +1,232 @@
+"""
+Tests for the load generator
+"""
+import json
+import os
+import sys
+import threading
+import pytest
+from werkzeug.serving import make_server
+from flask import Flask, request
+from flite.bench import (
+    BenchServer, build_targets, discover_routes, free_port, load_fixtures, percentile, run_load, run_microbenchmarks,
+    server_command
+)
+from .test_base import TestBase
+
+APP_INIT = '''
+from flask import Flask, jsonify, request
+
+def create_app():
+    app = Flask(__name__)
+
+    @app.route('/items', methods=['GET', 'POST'])
+    def items():
+        if request.method == 'POST':
+            return jsonify(request.get_json()), 201
+        return jsonify([])
+
+    @app.route('/items/<int:item_id>', methods=['GET', 'DELETE'])
+    def item(item_id):
+        return jsonify({'id': item_id})
+
+    return app
+'''
+
+RUN_PY = '''
+import sys
+from app import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    host = sys.argv[sys.argv.index('--host') + 1]
+    port = int(sys.argv[sys.argv.index('--port') + 1])
+    app.run(host=host, port=port)
+'''
+
+# Stands in for a generated benchmarks/ package: records its arguments
+BENCHMARKS_MAIN = '''
+import json
+import sys
+
+args = sys.argv[1:]
+if '--route' in args and args[args.index('--route') + 1] == '/broken':
+    raise SystemExit('no route matches /broken')
+with open(args[args.index('--json') + 1], 'w', encoding='utf-8') as f:
+    json.dump({'args': args, 'routes': [], 'samples': {}}, f)
+'''
+
+class TestBench(TestBase):
+    """Test route discovery, targets and the asyncio client"""
+
+    def _serve(self, app):
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        return server
+
+    def test_build_targets(self):
+        """Test GET routes load as discovered and other methods need a fixture"""
+        routes = [
+            {'rule': '/items', 'methods': ['GET', 'POST'], 'path': '/items'},
+            {'rule': '/items/<int:item_id>', 'methods': ['DELETE', 'GET'], 'path': '/items/1'},
+            {'rule': '/files/<path:name>', 'methods': ['GET'], 'path': None}
+        ]
+        fixtures = {
+            'POST /items': [{'json': {'name': 'a'}}, {'body': 'name=b', 'headers': {'Content-Type': 'application/x-www-form-urlencoded'}}],
+            'GET /items/<int:item_id>': [{'path': '/items/7'}],
+            'GET /gone': [{}]
+        }
+
+        targets, skipped = build_targets(routes, fixtures)
+
+        assert [target.label for target in targets] == ['GET /items', 'POST /items', 'GET /items/<int:item_id>']
+        post = targets[1]
+        assert post.next_request() == ('/items', {'Content-Type': 'application/json'}, b'{"name": "a"}')
+        assert post.next_request()[2] == b'name=b'
+        assert post.next_request()[2] == b'{"name": "a"}'
+        assert targets[2].next_request()[0] == '/items/7'
+        assert dict(skipped) == {
+            'DELETE /items/<int:item_id>': 'no fixture',
+            'GET /files/<path:name>': 'no path for its arguments, set one in the fixtures',
+            'GET /gone': 'fixture matches no route'
+        }
+        assert [target.label for target in build_targets(routes, prefixes=['/items/'])[0]] == ['GET /items/<int:item_id>']
+
+    def test_load_fixtures(self):
+        """Test a single fixture becomes a list of one"""
+        with open('bench.json', 'w', encoding='utf-8') as f:
+            json.dump({'POST /items': {'json': {'name': 'a'}}}, f)
+        assert load_fixtures('bench.json') == {'POST /items': [{'json': {'name': 'a'}}]}
+
+        with open('bench.json', 'w', encoding='utf-8') as f:
+            json.dump([], f)
+        with pytest.raises(ValueError):
+            load_fixtures('bench.json')
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile(values, 1.0) == 100
+        assert percentile([3], 0.9) == 3
+        assert percentile([], 0.5) is None
+
+    def test_run_load(self):
+        """Test requests are counted per route with their statuses, bodies included"""
+        app = Flask(__name__)
+        received = []
+
+        @app.route('/ok')
+        def ok():
+            return 'x' * 5000
+
+        @app.route('/missing')
+        def missing():
+            return 'no', 404
+
+        @app.route('/echo', methods=['POST'])
+        def echo():
+            received.append(request.get_json())
+            return request.get_data()
+
+        server = self._serve(app)
+        try:
+            routes = [
+                {'rule': '/ok', 'methods': ['GET'], 'path': '/ok'},
+                {'rule': '/missing', 'methods': ['GET'], 'path': '/missing'},
+                {'rule': '/echo', 'methods': ['POST'], 'path': '/echo'}
+            ]
+            targets, skipped = build_targets(routes, {'POST /echo': [{'json': {'n': 1}}]})
+            report = run_load(f'http://127.0.0.1:{server.port}', targets, concurrency=4, warmup=0.2, duration=0.5)
+        finally:
+            server.shutdown()
+
+        by_route = {route['route']: route for route in report['routes']}
+        assert by_route['GET /ok']['requests'] > 0
+        assert by_route['GET /ok']['errors'] == 0
+        assert by_route['GET /ok']['bytes'] == 5000 * by_route['GET /ok']['requests']
+        assert by_route['GET /missing']['error_rate'] == 1.0
+        assert by_route['GET /missing']['statuses'] == {'404': by_route['GET /missing']['requests']}
+        assert by_route['POST /echo']['statuses'] == {'200': by_route['POST /echo']['requests']}
+        assert received[0] == {'n': 1}
+        # Warm-up requests reach the server but aren't counted
+        assert len(received) > by_route['POST /echo']['requests']
+        total = report['total']
+        assert total['requests'] == sum(route['requests'] for route in report['routes'])
+        assert total['p50_ms'] <= total['p90_ms'] <= total['p99_ms'] <= total['max_ms']
+
+    def test_run_load_rate(self):
+        """Test a fixed rate sends requests on schedule"""
+        app = Flask(__name__)
+        app.add_url_rule('/ok', 'ok', lambda: 'ok')
+        server = self._serve(app)
+        try:
+            targets, skipped = build_targets([{'rule': '/ok', 'methods': ['GET'], 'path': '/ok'}])
+            report = run_load(f'http://127.0.0.1:{server.port}', targets, concurrency=2, rate=40, warmup=0, duration=1.0)
+        finally:
+            server.shutdown()
+
+        assert 38 <= report['total']['requests'] <= 41
+
+    def test_run_load_unreachable(self):
+        """Test a server that isn't there fails before any load"""
+        targets, skipped = build_targets([{'rule': '/ok', 'methods': ['GET'], 'path': '/ok'}])
+        with pytest.raises(ConnectionError):
+            run_load(f'http://127.0.0.1:{free_port()}', targets, duration=0.5)
+
+    def test_discover_and_serve(self):
+        """Test routes are listed from the project and run.py serves the benchmark"""
+        os.makedirs('app')
+        with open(os.path.join('app', '__init__.py'), 'w', encoding='utf-8') as f:
+            f.write(APP_INIT)
+        with open('run.py', 'w', encoding='utf-8') as f:
+            f.write(RUN_PY)
+
+        routes = discover_routes(sys.executable)
+        assert {route['rule']: (route['methods'], route['path']) for route in routes} == {
+            '/items': (['GET', 'POST'], '/items'),
+            '/items/<int:item_id>': (['DELETE', 'GET'], '/items/1')
+        }
+
+        targets, skipped = build_targets(routes, {'POST /items': [{'json': {'name': 'a'}}]})
+        port = free_port()
+        with BenchServer(server_command(sys.executable, 'run', '127.0.0.1', port), '127.0.0.1', port) as server:
+            report = run_load(server.url, targets, concurrency=2, warmup=0, duration=0.5)
+            process = server.process
+
+        assert process.poll() is not None
+        assert report['total']['requests'] > 0
+        assert report['total']['errors'] == 0
+        assert {route['route'] for route in report['routes']} == {'GET /items', 'POST /items', 'GET /items/<int:item_id>'}
+
+    def test_server_exits(self):
+        """Test a server that dies on start reports its last line"""
+        with open('run.py', 'w', encoding='utf-8') as f:
+            f.write("raise SystemExit('port already taken')\n")
+        port = free_port()
+        with pytest.raises(RuntimeError, match='port already taken'):
+            with BenchServer(server_command(sys.executable, 'run', '127.0.0.1', port), '127.0.0.1', port):
+                pass
+
+    def test_gunicorn_command(self):
+        """Test the production server serves wsgi.py with the given workers"""
+        command = server_command('python', 'gunicorn', '127.0.0.1', 8000, workers=4)
+        assert command == ['python', '-m', 'gunicorn', '--bind', '127.0.0.1:8000', '--workers', '4', 'wsgi:app']
+
+    def test_run_microbenchmarks(self):
+        """Test the project's suite gets the options and its report is read back"""
+        os.makedirs('benchmarks')
+        open(os.path.join('benchmarks', '__init__.py'), 'w').close()
+        with open(os.path.join('benchmarks', '__main__.py'), 'w', encoding='utf-8') as f:
+            f.write(BENCHMARKS_MAIN)
+
+        report = run_microbenchmarks(sys.executable, iterations=5, warmup=1, memory=False, prefixes=['/api'])
+        args = report['args']
+        assert args[:4] == ['--iterations', '5', '--warmup', '1']
+        assert args[6:] == ['--no-memory', '--route', '/api']
+
+        with pytest.raises(RuntimeError, match='no route matches /broken'):
+            run_microbenchmarks(sys.executable, prefixes=['/broken'])
@@ -0,0 +1,90 @@
+"""
+Tests for production build steps
+"""
+import pytest
+import os
+import sys
+from flite.build import precompile_templates, byte_compile
+from flite.generator import ProjectGenerator
+from .test_base import TestBase
+
+class TestBuild(TestBase):
+    """Test build steps against generated projects"""
+    
+    def generate_project(self, template='basic', database='none', api=False):
+        """Generate project files into the test directory"""
+        generator = ProjectGenerator()
+        generator._create_directory_structure()
+        generator._generate_files('test_build', template, database, False, api, 'none')
+    
+    def test_precompile_templates(self):
+        """Test templates are compiled into the configured bytecode cache"""
+        self.generate_project()
+        
+        report = precompile_templates(sys.executable, repeat=1)
+        
+        assert report['configured'] == True
+        assert report['templates'] == ['base.html', 'index.html']
+        assert report['errors'] == {}
+        assert report['render_before'] > 0
+        assert report['render_after'] > 0
+        cache_files = os.listdir(os.path.join('build', 'templates'))
+        assert len(cache_files) == 2
+        assert all(name.startswith('__jinja2_') for name in cache_files)
+    
+    def test_app_loads_precompiled_templates(self):
+        """Test the generated app attaches the bytecode cache once built"""
+        self.generate_project()
+        precompile_templates(sys.executable, repeat=1)
+        
+        sys.path.insert(0, os.getcwd())
+        try:
+            from app import create_app
+            app = create_app()
+            assert app.jinja_env.bytecode_cache is not None
+            assert os.path.realpath(app.jinja_env.bytecode_cache.directory) == os.path.realpath(os.path.join('build', 'templates'))
+        finally:
+            sys.path.remove(os.getcwd())
+            for name in [name for name in sys.modules if name == 'app' or name.startswith('app.') or name == 'config']:
+                del sys.modules[name]
+    
+    def test_precompile_reports_template_errors(self):
+        """Test templates that fail to compile are reported by name"""
+        self.generate_project()
+        with open('app/templates/broken.html', 'w', encoding='utf-8') as f:
+            f.write('{% if %}')
+        
+        report = precompile_templates(sys.executable, repeat=1)
+        
+        assert 'broken.html' in report['errors']
+        assert 'broken.html' not in report['templates']
+    
+    def test_precompile_without_app(self):
+        """Test a missing app is reported as an error"""
+        with pytest.raises(RuntimeError):
+            precompile_templates(sys.executable, repeat=1)
+    
+    def test_byte_compile(self):
+        """Test project sources are compiled for normal and optimized runs"""
+        self.generate_project()
+        os.makedirs('build')
+        with open(os.path.join('build', 'skipped.py'), 'w', encoding='utf-8') as f:
+            f.write('x = 1\n')
+        
+        report = byte_compile(sys.executable)
+        
+        assert report['venv'] is None
+        cached = os.listdir(os.path.join('app', '__pycache__'))
+        assert any(name.startswith('__init__.') and name.endswith('.opt-1.pyc') for name in cached)
+        assert any(name.startswith('__init__.cpython') and not '.opt-' in name for name in cached)
+        assert os.path.isdir('__pycache__')
+        assert not os.path.exists(os.path.join('build', '__pycache__'))
+    
+    def test_byte_compile_reports_syntax_errors(self):
+        """Test a project file that does not compile fails the build"""
+        self.generate_project()
+        with open(os.path.join('app', 'broken.py'), 'w', encoding='utf-8') as f:
+            f.write('def broken(:\n')
+        
+        with pytest.raises(RuntimeError):
+            byte_compile(sys.executable)
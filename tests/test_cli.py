@@ -57,6 +57,14 @@ class TestCLI(TestBase):
         assert result.returncode == 1
         assert 'Invalid project name' in result.stdout
     
+    def test_create_command_search_without_api(self):
+        """Test the search feature is refused without the API endpoints"""
+        result = subprocess.run([sys.executable, '-m', 'flite', 'create', 'test_search', '--feature', 'search'],
+                              capture_output=True, text=True)
+        assert result.returncode == 1
+        assert 'search feature needs the API endpoints' in result.stdout
+        assert not os.path.exists('test_search')
+    
     def test_create_command_existing_directory(self):
         """Test project creation when directory exists"""
         # Create directory first
@@ -73,6 +73,31 @@ class TestProjectGenerator(TestBase):
         assert generator._validate_frontend('invalid') == False
         assert generator._validate_frontend('') == False
     
+    def test_validate_features(self):
+        """Test optional feature validation"""
+        generator = ProjectGenerator()
+        
+        # Valid features
+        assert generator._validate_features(None) == True
+        assert generator._validate_features([]) == True
+        assert generator._validate_features(['search']) == True
+        assert generator._validate_features(['search', 'cache']) == True
+        
+        # Invalid features
+        assert generator._validate_features(['invalid']) == False
+        assert generator._validate_features(['search', '']) == False
+    
+    def test_validate_feature_requirements(self):
+        """Test search needs the API endpoints and a database"""
+        generator = ProjectGenerator()
+        
+        assert generator._validate_feature_requirements(None, 'none', False) == True
+        assert generator._validate_feature_requirements(['search'], 'sqlite', True) == True
+        assert generator._validate_feature_requirements(['cache'], 'none', False) == True
+        
+        assert generator._validate_feature_requirements(['search'], 'sqlite', False) == False
+        assert generator._validate_feature_requirements(['search'], 'none', True) == False
+    
     def test_get_database_url(self):
         """Test database URL generation"""
         generator = ProjectGenerator()
@@ -131,6 +156,9 @@ class TestProjectGenerator(TestBase):
         self.assert_file_exists('.env')
         self.assert_file_exists('.gitignore')
         
+        # Alembic is only imported for `flask db` commands
+        self.assert_file_contains('app/__init__.py', 'if click.get_current_context(silent=True) is not None:')
+        
         # Check templates
         self.assert_file_exists('app/templates/base.html')
         self.assert_file_exists('app/templates/index.html')
@@ -162,6 +190,318 @@ class TestProjectGenerator(TestBase):
         # Check requirements include API dependencies
         self.assert_file_contains('requirements.txt', 'Flask-RESTful')
         self.assert_file_contains('requirements.txt', 'Flask-CORS')
+        
+        # Check API blueprint is registered
+        self.assert_file_contains('app/__init__.py', 'app.register_blueprint(api_bp)')
+    
+    def test_generate_api_crud_handlers(self):
+        """Test API handlers write with a single statement"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none')
+        
+        # Update uses UPDATE ... RETURNING, delete checks rowcount
+        self.assert_file_contains('app/api_routes.py', 'stmt.returning(ExampleModel)')
+        self.assert_file_contains('app/api_routes.py', 'result.rowcount == 0')
+        self.assert_file_contains('app/api_routes.py', 'payload = example.to_dict()\n    db.session.commit()')
+        
+        # Generated tests assert the statement count per endpoint
+        self.assert_file_exists('tests/__init__.py')
+        self.assert_file_contains('tests/conftest.py', "event.listen(db.engine, 'before_cursor_execute'")
+        self.assert_file_contains('tests/test_api.py', 'assert len(statements) == 1')
+    
+    def test_generate_json_provider(self):
+        """Test JSON provider generation for API projects"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none')
+        
+        self.assert_file_contains('app/json_provider.py', 'import orjson')
+        self.assert_file_contains('app/json_provider.py', 'class JSONProvider(DefaultJSONProvider)')
+        self.assert_file_contains('app/__init__.py', 'app.json = JSONProvider(app)')
+        self.assert_file_contains('requirements.txt', 'orjson')
+        
+        # Datetimes are left to the provider
+        with open('app/api_models.py', 'r', encoding='utf-8') as f:
+            assert 'isoformat' not in f.read()
+        
+        # Basic projects keep Flask's default provider
+        os.remove('app/json_provider.py')
+        generator._generate_files('test_basic', 'basic', 'sqlite', False, False, 'bootstrap')
+        assert not os.path.exists('app/json_provider.py')
+    
+    def test_generate_negotiation(self):
+        """Test all API routes go through the negotiation layer"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none')
+        
+        self.assert_file_contains('app/negotiation.py', "MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')")
+        self.assert_file_contains('app/negotiation.py', 'abort(415)')
+        self.assert_file_contains('app/routes.py', 'from app.negotiation import respond')
+        self.assert_file_contains('app/api_routes.py', 'from app.negotiation import respond')
+        self.assert_file_contains('app/validation.py', 'from app.negotiation import get_payload, respond')
+        self.assert_file_contains('requirements.txt', 'msgpack')
+        
+        for path in ('app/routes.py', 'app/api_routes.py'):
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+                assert 'jsonify' not in content
+                assert 'request.get_json' not in content
+    
+    def test_generate_validation(self):
+        """Test request schemas are declared per route and compiled at startup"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none')
+        
+        self.assert_file_contains('app/validation.py', 'def compile_schema(schema, bulk=False, max_items=1000):')
+        self.assert_file_contains('app/api_routes.py', '@validate_body(EXAMPLE_SCHEMA, bulk=True)')
+        self.assert_file_contains('app/api_routes.py', '@validate_body(EXAMPLE_UPDATE_SCHEMA)')
+        self.assert_file_contains('app/__init__.py', 'init_validation(app)')
+        self.assert_file_contains('tests/test_api.py', "'[1].name'")
+        
+        # The generated module must be valid Python
+        with open('app/validation.py', 'r', encoding='utf-8') as f:
+            compile(f.read(), 'app/validation.py', 'exec')
+    
+    def test_generate_search_feature(self):
+        """Test the search feature adds the FTS index and endpoint"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['search'])
+        
+        self.assert_file_contains('app/search.py', 'USING fts5(')
+        self.assert_file_contains('app/search.py', 'CREATE TRIGGER')
+        self.assert_file_contains('app/search.py', 'USING GIN (search_vector)')
+        self.assert_file_contains('app/api_routes.py', "@api_bp.route('/examples/search', methods=['GET'])")
+        self.assert_file_contains('tests/test_api.py', 'def test_search_ranks_and_paginates')
+    
+    def test_generate_cache_feature(self):
+        """Test the cache feature wires the response cache into routes"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['cache'])
+        
+        self.assert_file_contains('app/cache.py', 'class LRUCache:')
+        self.assert_file_contains('app/__init__.py', 'init_cache(app)')
+        self.assert_file_contains('config.py', 'RESPONSE_CACHE_MAX_BYTES')
+        self.assert_file_contains('app/routes.py', "@cached(ttl=300)\ndef index():")
+        self.assert_file_contains('app/api_routes.py', "@cached(ttl=30, tags=('examples',))\ndef get_examples():")
+        self.assert_file_contains('app/api_routes.py', "db.session.commit()\n    invalidate('examples')")
+        self.assert_file_contains('tests/test_api.py', 'def test_get_is_cached_until_a_write')
+        assert not os.path.exists('app/shared_cache.py')
+    
+    def test_generate_query_cache_feature(self):
+        """Test the query-cache feature caches the list query by table version"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['query-cache'])
+        
+        self.assert_file_contains('app/cache.py', 'class LRUCache:')
+        self.assert_file_contains('app/query_cache.py', 'class QueryCache:')
+        self.assert_file_contains('app/__init__.py', 'init_query_cache(app)')
+        self.assert_file_contains('config.py', 'QUERY_CACHE_MAX_BYTES')
+        self.assert_file_contains('app/api_routes.py', '@cached_query(tables=(ExampleModel.__tablename__,))')
+        self.assert_file_contains('app/api_routes.py', 'return respond(list_examples())')
+        self.assert_file_contains('tests/test_api.py', 'def test_concurrent_misses_collapse_into_one_load')
+        with open('app/__init__.py', 'r', encoding='utf-8') as f:
+            assert 'init_cache(app)' not in f.read()
+    
+    def test_generate_shared_cache_feature(self):
+        """Test the shared-cache feature backs the caches with a shared mmap file"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['cache', 'shared-cache'])
+        
+        self.assert_file_contains('app/shared_cache.py', 'class SharedCache:')
+        self.assert_file_contains('app/shared_cache.py', 'os.register_at_fork(after_in_child=_reset_thread_locks_after_fork)')
+        self.assert_file_contains('tests/test_api.py', 'def test_shared_cache_settings_get_a_file_each')
+        self.assert_file_contains('tests/conftest.py', 'close_shared_caches(app)')
+        self.assert_file_contains('app/cache.py', 'from app.shared_cache import SharedCache')
+        self.assert_file_contains('app/cache.py', "cache = create_store(\n        app, 'response',")
+        self.assert_file_contains('config.py', "CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'shared')")
+        self.assert_file_contains('tests/test_api.py', 'def test_shared_cache_is_shared_between_processes')
+    
+    def test_generate_fragment_cache_feature(self):
+        """Test the fragment-cache feature registers the cache tag"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_app', 'basic', 'none', False, False, 'none', ['fragment-cache'])
+        
+        self.assert_file_contains('app/fragment_cache.py', 'class FragmentCacheExtension(Extension):')
+        self.assert_file_contains('app/cache.py', 'def create_store(app, name, max_bytes, default_ttl):')
+        self.assert_file_contains('app/__init__.py', 'init_fragment_cache(app)')
+        self.assert_file_contains('config.py', 'FRAGMENT_CACHE_MAX_BYTES')
+        self.assert_file_contains('app/templates/index.html', "{% cache 'index-hero', 3600 %}")
+        self.assert_file_contains('app/templates/index.html', '{% endcache %}')
+    
+    def test_generate_timing_feature(self):
+        """Test the timing feature instruments requests after the JSON provider is set"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['timing'])
+        
+        self.assert_file_contains('app/timing.py', 'class RequestTiming:')
+        self.assert_file_contains('app/timing.py', "response.headers['Server-Timing']")
+        self.assert_file_contains('config.py', 'SLOW_REQUEST_MS')
+        self.assert_file_contains('tests/test_api.py', 'def test_server_timing_header_in_debug_mode')
+        # Start times live on the statement's context, failed statements leave none behind
+        self.assert_file_contains('app/timing.py', 'context._flite_timing_started = time.perf_counter()')
+        with open('app/__init__.py', 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert content.index('app.json = JSONProvider(app)') < content.index('init_timing(app)')
+    
+    def test_generate_metrics_feature(self):
+        """Test the metrics feature serves /metrics from every worker's counts"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['metrics', 'cache'])
+        
+        self.assert_file_contains('app/metrics.py', 'class Metrics:')
+        self.assert_file_contains('app/metrics.py', "app.add_url_rule('/metrics'")
+        self.assert_file_contains('app/metrics.py', "if hasattr(os, 'register_at_fork'):\n    os.register_at_fork(after_in_child=_reset_after_fork)")
+        self.assert_file_contains('app/__init__.py', 'init_metrics(app)')
+        self.assert_file_contains('config.py', 'METRICS_DIR')
+        self.assert_file_contains('tests/test_api.py', 'def test_metrics_add_up_across_processes')
+    
+    def test_generate_query_budget_feature(self):
+        """Test the query-budget feature declares budgets on the API routes"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['query-budget'])
+        
+        self.assert_file_contains('app/query_budget.py', 'class QueryBudgetExceeded(AssertionError):')
+        self.assert_file_contains('app/query_budget.py', 'def statement_shape(statement):')
+        self.assert_file_contains('app/__init__.py', 'init_query_budget(app)')
+        self.assert_file_contains('app/api_routes.py', "@api_bp.route('/examples', methods=['GET'])\n@query_budget(1)\ndef get_examples():")
+        self.assert_file_contains('config.py', 'QUERY_REPEAT_THRESHOLD')
+        self.assert_file_contains('tests/test_api.py', 'def test_query_budget_overrun_fails_the_test')
+        # Stacked above @validate_body, the budget wrapper shares the compiled validator
+        self.assert_file_contains('app/validation.py', "declared['validator'] = compiled[key]")
+        self.assert_file_contains('tests/test_api.py', 'def test_validators_under_a_query_budget_are_compiled_at_startup')
+    
+    def test_generate_slow_queries_feature(self):
+        """Test the slow-queries feature attaches to the engine after db.init_app"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['slow-queries'])
+        
+        self.assert_file_contains('app/slow_queries.py', 'class SlowQueryLog:')
+        self.assert_file_contains('app/slow_queries.py', "'EXPLAIN QUERY PLAN '")
+        self.assert_file_contains('app/slow_queries.py', "return f'{root}.{os.getpid()}{extension}'")
+        self.assert_file_contains('app/slow_queries.py', 'context._flite_slow_query_started = time.perf_counter()')
+        self.assert_file_contains('config.py', 'SLOW_QUERY_MS')
+        self.assert_file_contains('tests/test_api.py', 'def test_slow_statements_are_logged_with_their_plan')
+        with open('app/__init__.py', 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert content.index('db.init_app(app)') < content.index('init_slow_queries(app)')
+    
+    def test_generate_sampler_feature(self):
+        """Test the sampler feature can be toggled by signal or endpoint"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['sampler'])
+        
+        self.assert_file_contains('app/sampler.py', 'class SamplingProfiler:')
+        self.assert_file_contains('app/sampler.py', 'sys._current_frames()')
+        self.assert_file_contains('app/__init__.py', 'init_sampler(app)')
+        self.assert_file_contains('config.py', "SAMPLER_SIGNAL = os.environ.get('SAMPLER_SIGNAL')\n")
+        self.assert_file_contains('app/sampler.py', 'if signal_name and not app.testing and hasattr(signal, signal_name):')
+        self.assert_file_contains('tests/test_api.py', 'def test_sampler_endpoints_need_the_token')
+    
+    def test_generate_benchmarks_feature(self):
+        """Test the benchmarks feature emits a runnable package with fixtures for the API writes"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['benchmarks', 'search'])
+        
+        self.assert_file_contains('benchmarks/__main__.py', 'from benchmarks.routes import main')
+        self.assert_file_contains('benchmarks/routes.py', 'def run_benchmarks(')
+        # tracemalloc.reset_peak() is Python 3.9+
+        self.assert_file_contains('benchmarks/routes.py', "getattr(tracemalloc, 'reset_peak', _restart_tracing)")
+        self.assert_file_contains('benchmarks/routes.py', "'POST /api/examples': {'json':")
+        self.assert_file_contains('benchmarks/routes.py', '    app = create_app(BenchmarkConfig)')
+        self.assert_file_contains('benchmarks/routes.py', "'GET /api/examples/search': {'path': '/api/examples/search?q=Example'}")
+        self.assert_file_contains('benchmarks/routes.py', 'ExampleModel(name=f')
+        self.assert_file_contains('tests/test_api.py', 'def test_benchmarks_run_every_route')
+        compile(open('benchmarks/routes.py', encoding='utf-8').read(), 'benchmarks/routes.py', 'exec')
+    
+    def test_generate_benchmarks_feature_basic(self):
+        """Test the benchmarks of a project without models seed nothing"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_basic', 'basic', 'none', False, False, 'none', ['benchmarks'])
+        
+        self.assert_file_contains('benchmarks/routes.py', 'FIXTURES = {\n}')
+        self.assert_file_contains('benchmarks/routes.py', '# No model to seed yet')
+        assert 'api_models' not in open('benchmarks/routes.py', encoding='utf-8').read()
+    
+    def test_generate_conftest(self):
+        """Test projects with a database get transactional test fixtures"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none', ['shared-cache'])
+        
+        self.assert_file_exists('tests/__init__.py')
+        self.assert_file_contains('tests/conftest.py', "@pytest.fixture(scope='session')")
+        self.assert_file_contains('tests/conftest.py', "join_transaction_mode='create_savepoint'")
+        self.assert_file_contains('tests/conftest.py', "os.environ.get('PYTEST_XDIST_WORKER', 'main')")
+        self.assert_file_contains('tests/conftest.py', 'CACHE_SHARED_DIR = str(directory)')
+        self.assert_file_contains('requirements-dev.txt', 'pytest>=7.0.0')
+        self.assert_file_contains('requirements-dev.txt', '-r requirements.txt')
+        assert 'pytest' not in open('requirements.txt', encoding='utf-8').read()
+        # The API tests use the fixtures of the conftest
+        assert 'def app(' not in open('tests/test_api.py', encoding='utf-8').read()
+        compile(open('tests/conftest.py', encoding='utf-8').read(), 'conftest.py', 'exec')
+    
+    def test_generate_conftest_without_database(self):
+        """Test there is nothing to roll back without a database"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_basic', 'basic', 'none', False, False, 'none')
+        
+        assert not os.path.exists('tests/conftest.py')
+        assert not os.path.exists('requirements-dev.txt')
+    
+    def test_generate_api_without_database(self):
+        """Test API projects without a database get no tests needing one"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'none', False, True, 'none')
+        
+        assert not os.path.exists('tests/test_api.py')
+        assert not os.path.exists('tests/conftest.py')
+    
+    def test_generate_without_search_feature(self):
+        """Test search is opt-in"""
+        generator = ProjectGenerator()
+        
+        generator._create_directory_structure()
+        generator._generate_files('test_api', 'api', 'sqlite', False, True, 'none')
+        
+        assert not os.path.exists('app/search.py')
+        with open('app/api_routes.py', 'r', encoding='utf-8') as f:
+            assert '/examples/search' not in f.read()
     
     def test_generate_files_auth(self):
         """Test auth file generation"""
@@ -0,0 +1,168 @@
+"""
+Tests for the benchmark history and regression detection
+"""
+import random
+import sqlite3
+import subprocess
+from contextlib import closing
+from flite.history import (
+    block_medians, compare_runs, connect, git_info, latest_run, list_runs, load_run, mann_whitney, record_run, resolve_baseline
+)
+from .test_base import TestBase
+
+ENV = {'hostname': 'bench-box', 'cpu_count': 8}
+SETTINGS = {'concurrency': 10, 'rate': 0.0, 'routes': ['GET /items']}
+
+def make_report(latency_ms, rps=100, seed=0, spread=0.1):
+    """A run_load report with one route around latency_ms"""
+    rng = random.Random(seed)
+    samples = [latency_ms * (1 + rng.uniform(-spread, spread)) for _ in range(500)]
+    summary = {
+        'route': 'GET /items', 'requests': len(samples), 'rps': rps, 'error_rate': 0.0,
+        'mean_ms': sum(samples) / len(samples), 'p50_ms': sorted(samples)[250], 'p90_ms': None,
+        'p99_ms': sorted(samples)[495], 'max_ms': max(samples)
+    }
+    return {
+        'routes': [summary],
+        'total': dict(summary, route='total'),
+        'per_second': [round(rps * (1 + rng.uniform(-spread, spread))) for _ in range(10)],
+        'samples': {'GET /items': samples, 'total': samples}
+    }
+
+def git(*args):
+    subprocess.run(['git', '-c', 'user.email=bench@example.com', '-c', 'user.name=bench'] + list(args),
+                   check=True, capture_output=True)
+
+class TestHistory(TestBase):
+    """Test runs are recorded, found again and compared"""
+
+    def _record(self, connection, report, commit, settings=SETTINGS, kind='load'):
+        return record_run(connection, kind, report, settings, ENV, {'commit': commit, 'branch': 'main', 'dirty': False})
+
+    def test_record_and_load(self):
+        """Test a run comes back with its tags, totals and samples"""
+        with closing(connect('.flite/bench.db')) as connection:
+            run_id = self._record(connection, make_report(20), 'a' * 40)
+            run = load_run(connection, run_id)
+            listed = list_runs(connection)
+
+        assert run['kind'] == 'load'
+        assert run['git_commit'] == 'a' * 40
+        assert run['environment'] == ENV
+        assert run['settings'] == SETTINGS
+        assert len(run['per_second']) == 10
+        assert set(run['results']) == {'GET /items', 'total'}
+        assert len(run['results']['GET /items']['samples']) == 500
+        assert [(entry['id'], entry['routes'], entry['total']['rps']) for entry in listed] == [(run_id, 1, 100)]
+
+    def test_git_info(self):
+        """Test the commit and dirtiness of the working tree are picked up"""
+        assert git_info() == {'commit': None, 'branch': None, 'dirty': None}
+
+        git('init', '-q')
+        with open('app.py', 'w', encoding='utf-8') as f:
+            f.write('x = 1\n')
+        git('add', 'app.py')
+        git('commit', '-qm', 'first')
+        info = git_info()
+        assert len(info['commit']) == 40
+        assert info['dirty'] is False
+
+        with open('app.py', 'w', encoding='utf-8') as f:
+            f.write('x = 2\n')
+        assert git_info()['dirty'] is True
+
+    def test_resolve_baseline(self):
+        """Test the baseline defaults to the runs of the previous commit"""
+        with closing(connect('.flite/bench.db')) as connection:
+            old = self._record(connection, make_report(20), 'a' * 40)
+            first = self._record(connection, make_report(20), 'b' * 40)
+            second = self._record(connection, make_report(20), 'b' * 40)
+            self._record(connection, make_report(20), 'b' * 40, kind='micro')
+            candidate_id = self._record(connection, make_report(20), 'c' * 40)
+            candidate = latest_run(connection, 'load')
+
+            assert candidate['id'] == candidate_id
+            assert [run['id'] for run in resolve_baseline(connection, candidate)] == [second, first]
+            assert [run['id'] for run in resolve_baseline(connection, candidate, runs=1)] == [second]
+            assert [run['id'] for run in resolve_baseline(connection, candidate, f'#{old}')] == [old]
+            assert [run['id'] for run in resolve_baseline(connection, candidate, 'aaaa')] == [old]
+            assert resolve_baseline(connection, candidate, 'ffff') == []
+            # The first run has nothing before it
+            assert resolve_baseline(connection, load_run(connection, old)) == []
+
+    def test_mann_whitney(self):
+        """Test U and the normal approximation with continuity correction"""
+        u, p = mann_whitney([1, 2, 3, 4, 5], [6, 7, 8, 9, 10])
+        assert u == 0
+        assert abs(p - 0.0122) < 0.001
+        assert mann_whitney([6, 7, 8, 9, 10], [1, 2, 3, 4, 5])[0] == 25
+        # Ties share their ranks, identical samples can't differ
+        assert mann_whitney([5] * 10, [5] * 10) == (50.0, 1.0)
+
+    def test_block_medians(self):
+        """Test consecutive blocks are summarized by their medians"""
+        assert block_medians(list(range(100)), blocks=4) == [12, 37, 62, 87]
+        assert block_medians([1, 2, 3], blocks=10) == []
+
+    def test_compare_regression(self):
+        """Test a slower route and a lower throughput are regressions"""
+        with closing(connect('.flite/bench.db')) as connection:
+            self._record(connection, make_report(20, seed=1), 'a' * 40)
+            self._record(connection, make_report(20, seed=2), 'a' * 40)
+            candidate_id = self._record(connection, make_report(30, rps=60, seed=3), 'b' * 40)
+            candidate = load_run(connection, candidate_id)
+            comparison = compare_runs(resolve_baseline(connection, candidate), candidate)
+
+        items = comparison['routes'][0]
+        assert items['route'] == 'GET /items'
+        assert items['verdict'] == 'regression'
+        assert 0.4 < items['change'] < 0.6
+        assert items['p_value'] < 0.01
+        assert comparison['throughput']['verdict'] == 'regression'
+        assert comparison['regressions'] == ['GET /items', 'total', 'throughput']
+        assert comparison['mismatches'] == {}
+
+    def test_compare_noise(self):
+        """Test changes within the threshold or the baseline's own spread pass"""
+        with closing(connect('.flite/bench.db')) as connection:
+            self._record(connection, make_report(20, seed=1), 'a' * 40)
+            self._record(connection, make_report(20, seed=2), 'a' * 40)
+            same = load_run(connection, self._record(connection, make_report(20.4, seed=3), 'b' * 40))
+            comparison = compare_runs(resolve_baseline(connection, same), same)
+            assert comparison['routes'][0]['verdict'] == 'unchanged'
+            assert comparison['regressions'] == []
+
+            # The baseline runs differ by 30% from each other, a 20% change is noise
+            self._record(connection, make_report(15, seed=4), 'c' * 40)
+            self._record(connection, make_report(25, seed=5), 'c' * 40)
+            slower = load_run(connection, self._record(connection, make_report(24, seed=6), 'd' * 40))
+            comparison = compare_runs(resolve_baseline(connection, slower), slower)
+            assert comparison['routes'][0]['noise'] > 0.2
+            assert comparison['routes'][0]['verdict'] == 'unchanged'
+
+            faster = load_run(connection, self._record(connection, make_report(10, rps=200, seed=7), 'e' * 40))
+            comparison = compare_runs([load_run(connection, same['id'])], faster)
+            assert comparison['routes'][0]['verdict'] == 'improvement'
+            assert comparison['throughput']['verdict'] == 'improvement'
+            assert comparison['regressions'] == []
+
+    def test_compare_mismatches(self):
+        """Test differing settings are reported, and short runs aren't tested"""
+        with closing(connect('.flite/bench.db')) as connection:
+            baseline = load_run(connection, self._record(connection, make_report(20), 'a' * 40))
+            report = make_report(20)
+            report['per_second'] = [100, 100]
+            candidate = load_run(connection, self._record(connection, report, 'b' * 40, settings=dict(SETTINGS, concurrency=50)))
+
+        comparison = compare_runs([baseline], candidate)
+        assert comparison['mismatches'] == {'concurrency': ([10], 50)}
+        assert comparison['throughput']['verdict'] == 'too few samples'
+
+    def test_schema(self):
+        """Test the database is created under .flite and reopened as is"""
+        connect('.flite/bench.db').close()
+        with closing(sqlite3.connect('.flite/bench.db')) as connection:
+            tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert tables == {'runs', 'results'}
+        connect('.flite/bench.db').close()
@@ -0,0 +1,192 @@
+"""
+Tests for the bulk importer
+"""
+import json
+import os
+import sqlite3
+import sys
+from contextlib import closing
+import pytest
+from flite.importer import detect_format, import_file
+from .test_base import TestBase
+
+APP_INIT = '''
+import enum
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+class Plan(enum.Enum):
+    free = 1
+    paid = 2
+
+class Author(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    handle = db.Column(db.String(12), unique=True, nullable=False)
+    active = db.Column(db.Boolean, nullable=False)
+    score = db.Column(db.Float)
+    balance = db.Column(db.Numeric(8, 2))
+    joined = db.Column(db.DateTime, nullable=False)
+    plan = db.Column(db.Enum(Plan), nullable=False)
+    settings = db.Column(db.JSON)
+    bio = db.Column(db.Text)
+
+def create_app(config_class):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    db.init_app(app)
+    return app
+'''
+
+CONFIG = '''
+import os
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app.db')
+'''
+
+def author(n, **fields):
+    return dict({'handle': f'a{n}', 'active': n % 2 == 0, 'joined': '2024-05-01T12:00:00', 'plan': 'free'}, **fields)
+
+class TestImport(TestBase):
+    """Test files are streamed into a table in batches, validated and resumable"""
+
+    def _project(self):
+        os.makedirs('app')
+        with open(os.path.join('app', '__init__.py'), 'w', encoding='utf-8') as f:
+            f.write(APP_INIT)
+        with open('config.py', 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+
+    def _ndjson(self, path, records):
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(record if isinstance(record, str) else json.dumps(record) + '\n')
+
+    def _query(self, sql):
+        with closing(sqlite3.connect('app.db')) as connection:
+            return connection.execute(sql).fetchall()
+
+    def _rejects(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_detect_format(self):
+        """Test the format comes from the extension"""
+        assert detect_format('data.csv') == 'csv'
+        assert detect_format('data.NDJSON') == 'ndjson'
+        assert detect_format('data.jsonl') == 'ndjson'
+        assert detect_format('data.txt') is None
+        with pytest.raises(ValueError, match='pass csv or ndjson'):
+            import_file(sys.executable, 'data.txt', 'Author')
+
+    def test_import_ndjson(self, capfd):
+        """Test values are converted per column and invalid records rejected with their line"""
+        self._project()
+        self._ndjson('authors.ndjson', [
+            author(1, id=7, score='2.5', balance='10.25', settings={'theme': 'dark'}, source='crm'),
+            author(2, handle='much-too-long-handle', active='maybe', joined='yesterday', plan='gold'),
+            '{"handle": "broken\n',
+            '\n',
+            author(3, active='yes', bio='Hi'),
+            {'active': True}
+        ])
+
+        report = import_file(sys.executable, 'authors.ndjson', 'Author', batch_size=2)
+
+        assert report == dict(report, model='Author', table='author', database='sqlite', rows=2, rejected=3,
+                              lines=6, resumed_from=0, ignored=['source'])
+        assert 'rows/s' in capfd.readouterr().out
+        assert self._query('SELECT id, handle, active, score, balance, plan, settings, bio FROM author ORDER BY id') == [
+            (7, 'a1', 0, 2.5, 10.25, 'free', '{"theme": "dark"}', None),
+            (8, 'a3', 1, None, None, 'free', None, 'Hi')
+        ]
+        rejects = self._rejects('authors.ndjson.rejects.ndjson')
+        assert [reject['line'] for reject in rejects] == [2, 3, 6]
+        assert rejects[0]['errors'] == [
+            'handle: is longer than 12 characters', 'active: is not a boolean',
+            "joined: Invalid isoformat string: 'yesterday'", 'plan: is not one of free, paid'
+        ]
+        assert rejects[1]['errors'][0].startswith('invalid JSON')
+        assert rejects[2]['errors'] == ['handle: is required', 'joined: is required', 'plan: is required']
+        # The checkpoint goes when the import is done, its table with it
+        assert self._query("SELECT name FROM sqlite_master WHERE name LIKE 'flite%'") == []
+
+    def test_import_csv(self):
+        """Test CSV columns are mapped, quoted newlines kept and empty fields NULL"""
+        self._project()
+        with open('authors.csv', 'w', encoding='utf-8-sig', newline='') as f:
+            f.write('name,active,score,joined,plan,bio,notes\r\n')
+            f.write('ann,true,,2024-05-01,paid,"Two\r\nlines, one field",x\r\n')
+            f.write('bob,0,1.5,2024-05-02T08:30:00,free,,y\r\n')
+            f.write('cy,1\r\n')
+
+        report = import_file(sys.executable, 'authors.csv', 'Author', mapping={'name': 'handle', 'notes': ''})
+
+        assert report == dict(report, rows=2, rejected=1, lines=5, ignored=['notes'])
+        assert self._query('SELECT handle, active, score, joined, plan, bio FROM author ORDER BY id') == [
+            ('ann', 1, None, '2024-05-01 00:00:00.000000', 'paid', 'Two\r\nlines, one field'),
+            ('bob', 0, 1.5, '2024-05-02 08:30:00.000000', 'free', '')
+        ]
+        assert self._rejects('authors.csv.rejects.ndjson') == [
+            {'line': 5, 'errors': ['has 2 fields, the header 7'], 'record': ['cy', '1']}
+        ]
+
+        with pytest.raises(RuntimeError, match='--map name=nick: author has no column nick'):
+            import_file(sys.executable, 'authors.csv', 'Author', mapping={'name': 'nick'})
+
+    def test_import_database_refusals(self):
+        """Test rows the database refuses are rejected one by one, the rest of their batch kept"""
+        self._project()
+        self._ndjson('authors.ndjson', [author(n) for n in range(1, 6)] + [author(2), author(6)])
+
+        report = import_file(sys.executable, 'authors.ndjson', 'Author', batch_size=100)
+
+        assert report['rows'] == 6
+        assert self._query('SELECT handle FROM author ORDER BY id') == [(f'a{n}',) for n in range(1, 7)]
+        rejects = self._rejects('authors.ndjson.rejects.ndjson')
+        assert [(reject['line'], reject['errors']) for reject in rejects] == [
+            (6, ['UNIQUE constraint failed: author.handle'])
+        ]
+
+    def test_import_resume(self):
+        """Test a stopped import resumes after its last batch, without repeating rows"""
+        self._project()
+        records = [author(n) for n in range(1, 101)]
+        for n in (45, 46, 47):
+            records[n - 1]['plan'] = 'gold'
+        self._ndjson('authors.ndjson', records)
+
+        with pytest.raises(RuntimeError, match='More than 2 rejected rows, the last on line 47'):
+            import_file(sys.executable, 'authors.ndjson', 'Author', batch_size=10, max_errors=2)
+        assert self._query('SELECT count(*) FROM author') == [(47,)]
+        assert self._query('SELECT line, rows, rejected FROM flite_import_checkpoint') == [(50, 47, 3)]
+
+        report = import_file(sys.executable, 'authors.ndjson', 'Author', batch_size=10, max_errors=2)
+
+        assert report == dict(report, rows=50, total_rows=97, rejected=3, lines=100, resumed_from=50)
+        assert self._query('SELECT count(*), count(DISTINCT handle) FROM author') == [(97, 97)]
+        assert len(self._rejects('authors.ndjson.rejects.ndjson')) == 3
+
+    def test_import_changed_file(self):
+        """Test a checkpoint isn't used for another file at the same path"""
+        self._project()
+        self._ndjson('authors.ndjson', [author(1), author(2, plan='gold'), author(3, plan='gold')])
+        with pytest.raises(RuntimeError, match='More than 1 rejected rows'):
+            import_file(sys.executable, 'authors.ndjson', 'Author', batch_size=1, max_errors=1)
+
+        self._ndjson('authors.ndjson', [author(4), author(5)])
+        with pytest.raises(RuntimeError, match='changed since its import stopped at line 3, pass --restart'):
+            import_file(sys.executable, 'authors.ndjson', 'Author')
+
+        report = import_file(sys.executable, 'authors.ndjson', 'Author', restart=True)
+        assert report == dict(report, rows=2, rejected=0, resumed_from=0)
+        assert self._query('SELECT handle FROM author ORDER BY id') == [('a1',), ('a4',), ('a5',)]
+
+    def test_import_unknown_model(self):
+        """Test the models are listed when the name matches none"""
+        self._project()
+        self._ndjson('authors.ndjson', [author(1)])
+        with pytest.raises(RuntimeError, match='No model called Writer, the models are Author'):
+            import_file(sys.executable, 'authors.ndjson', 'Writer')
@@ -0,0 +1,114 @@
+"""
+Tests for memory profiling
+"""
+import json
+import os
+import subprocess
+import sys
+from flite.memprofile import memory_report, memprofile_run_command
+from .test_base import TestBase
+
+# Stands in for a project's run.py: the server is replaced by a few
+# requests through the WSGI app that Flask.run would have served
+RUN_PY = '''
+import sys
+import werkzeug.serving
+from flask import Flask
+
+app = Flask(__name__)
+KEPT = []
+
+@app.route('/leak')
+def leak():
+    KEPT.append(bytearray(100000))
+    return 'leak'
+
+@app.route('/clean')
+def clean():
+    bytearray(100000)
+    return 'clean'
+
+def run_simple(host, port, application, **options):
+    from werkzeug.test import Client
+    client = Client(application)
+    for path in ('/leak', '/leak', '/clean', '/other'):
+        client.get(path)
+    print('reloader' if options.get('use_reloader') else 'no reloader')
+
+werkzeug.serving.run_simple = run_simple
+
+if __name__ == '__main__':
+    app.run(debug='--debug' in sys.argv)
+'''
+
+class TestMemoryProfiling(TestBase):
+    """Test per-route memory accounting and the leak report"""
+
+    def _run(self, **options):
+        with open('run.py', 'w', encoding='utf-8') as f:
+            f.write(RUN_PY)
+        return subprocess.run(memprofile_run_command(sys.executable, ['--debug'], **options), capture_output=True, text=True)
+
+    def _read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_memprofile_run(self):
+        """Test memory retained per route, a diff per sampled request and snapshots at start and exit"""
+        result = self._run(sample=1.0)
+
+        assert result.returncode == 0, result.stderr
+        assert 'no reloader' in result.stdout
+        snapshots = self._read(os.path.join('memprofile', 'snapshots.ndjson'))
+        assert len(snapshots) == 2
+        routes = snapshots[-1]['routes']
+        assert routes['GET /leak'][0] == 2
+        assert routes['GET /leak'][1] >= 2 * 100000
+        assert routes['GET /clean'][1] < 100000
+        assert routes['GET (unmatched)'][0] == 1
+
+        requests = self._read(os.path.join('memprofile', 'requests.ndjson'))
+        assert [request['route'] for request in requests] == ['GET /leak', 'GET /leak', 'GET /clean', 'GET (unmatched)']
+        assert [request['status'] for request in requests] == [200, 200, 200, 404]
+        assert any(line.endswith('run.py:11') and size >= 100000 for line, size, count in requests[0]['lines'])
+
+    def test_memprofile_path_filter(self):
+        """Test requests outside the path prefixes are not accounted"""
+        result = self._run(directory='clean-only', sample=0.0, paths=['/clean'])
+
+        assert result.returncode == 0, result.stderr
+        assert list(self._read(os.path.join('clean-only', 'snapshots.ndjson'))[-1]['routes']) == ['GET /clean']
+        assert not os.path.exists(os.path.join('clean-only', 'requests.ndjson'))
+
+    def test_memory_report(self):
+        """Test lines growing in every snapshot are reported as suspected leaks"""
+        os.makedirs('memprofile')
+        leak, cache, steady = os.path.abspath('app/leak.py:3'), os.path.abspath('app/cache.py:8'), os.path.abspath('app/steady.py:5')
+        with open(os.path.join('memprofile', 'snapshots.ndjson'), 'w', encoding='utf-8') as f:
+            for i, (leaked, cached) in enumerate([(1000, 5000), (2000, 9000), (3000, 7000), (4000, 9000)]):
+                f.write(json.dumps({
+                    'ts': 100 + i * 60, 'traced': 50000 + leaked, 'peak': 70000, 'rss': None,
+                    'routes': {'GET /leak': [i * 10, leaked], 'GET /steady': [i * 10, 0]},
+                    'lines': {leak: [leaked, i + 1], cache: [cached, 2], steady: [20000, 4]}
+                }) + '\n')
+            # Cut short when the process was killed
+            f.write('{"ts": 3')
+        with open(os.path.join('memprofile', 'requests.ndjson'), 'w', encoding='utf-8') as f:
+            for route in ('GET /leak', 'GET /leak', 'GET /steady'):
+                f.write(json.dumps({'ts': 130, 'route': route, 'status': 200, 'retained': 100, 'lines': [[leak, 100, 1]]}) + '\n')
+
+        report = memory_report('memprofile', top=5)
+
+        assert report['snapshots'] == 4
+        assert report['seconds'] == 180
+        assert report['traced'] == (51000, 54000)
+        assert [route['route'] for route in report['routes']] == ['GET /leak', 'GET /steady']
+        assert report['routes'][0]['per_request'] == 4000 / 30
+        assert [allocator['line'] for allocator in report['allocators']] == [
+            os.path.join('app', 'steady.py:5'), os.path.join('app', 'cache.py:8'), os.path.join('app', 'leak.py:3')
+        ]
+        # The cache went down once, the steady line never grew
+        assert report['leaks'] == [{'line': os.path.join('app', 'leak.py:3'), 'growth': 3000, 'size': 4000, 'snapshots': 4}]
+        assert report['retained_lines'][0]['requests'] == 3
+        assert report['retained_lines'][0]['routes'] == {'GET /leak': 2, 'GET /steady': 1}
+        assert memory_report('missing') is None
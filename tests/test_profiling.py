@@ -0,0 +1,86 @@
+"""
+Tests for request profiling
+"""
+import os
+import subprocess
+import sys
+from flite.profiling import profile_run_command, profile_top, read_profile_index
+from .test_base import TestBase
+
+# Stands in for a project's run.py: the server is replaced by a few
+# requests through the WSGI app that Flask.run would have served
+RUN_PY = '''
+import sys
+import time
+import werkzeug.serving
+from flask import Flask
+
+app = Flask(__name__)
+
+def busy_work():
+    return sum(i * i for i in range(200000))
+
+@app.route('/slow/<int:n>')
+def slow(n):
+    busy_work()
+    return 'slow'
+
+@app.route('/fast')
+def fast():
+    return 'fast'
+
+def run_simple(host, port, application, **options):
+    from werkzeug.test import Client
+    client = Client(application)
+    for path in ('/slow/1', '/slow/2', '/fast', '/other'):
+        client.get(path)
+    print('reloader' if options.get('use_reloader') else 'no reloader')
+
+werkzeug.serving.run_simple = run_simple
+
+if __name__ == '__main__':
+    app.run(debug='--debug' in sys.argv)
+'''
+
+class TestProfiling(TestBase):
+    """Test per-request profiles and their summary"""
+    
+    def _run(self, **options):
+        with open('run.py', 'w', encoding='utf-8') as f:
+            f.write(RUN_PY)
+        return subprocess.run(profile_run_command(sys.executable, ['--debug'], **options), capture_output=True, text=True)
+    
+    def test_profile_every_request(self):
+        """Test one profile per request, labelled with its URL rule"""
+        result = self._run()
+        
+        assert result.returncode == 0, result.stderr
+        # The reloader would restart run.py without the profiler
+        assert 'no reloader' in result.stdout
+        entries = read_profile_index('profiles')
+        assert [entry['route'] for entry in entries] == ['/slow/<int:n>', '/slow/<int:n>', '/fast', '(unmatched)']
+        assert [entry['status'] for entry in entries] == [200, 200, 200, 404]
+        assert all(os.path.exists(os.path.join('profiles', entry['file'])) for entry in entries)
+    
+    def test_profile_filters(self):
+        """Test path prefixes and the minimum duration select what is kept"""
+        result = self._run(directory='fast-only', paths=['/fast', '/other'], min_ms=0.0)
+        assert result.returncode == 0, result.stderr
+        assert [entry['path'] for entry in read_profile_index('fast-only')] == ['/fast', '/other']
+        
+        result = self._run(directory='none', sample=0.0)
+        assert result.returncode == 0, result.stderr
+        assert read_profile_index('none') == []
+    
+    def test_profile_top(self):
+        """Test profiles merge per route and the hottest function comes first"""
+        assert self._run().returncode == 0
+        
+        summary = profile_top('profiles', top=30, sort='cumtime')
+        
+        slow = summary[0]
+        assert slow['route'] == 'GET /slow/<int:n>'
+        assert slow['requests'] == 2
+        assert any(label.startswith('run.py:') and 'busy_work' in label and calls == 2 for label, calls, tottime, cumtime in slow['functions'])
+        assert [group['route'] for group in profile_top('profiles', route='/fast')] == ['GET /fast']
+        assert profile_top('missing') == []
@@ -0,0 +1,127 @@
+"""
+Tests for the synthetic data loader
+"""
+import os
+import sqlite3
+import sys
+from contextlib import closing
+import pytest
+from flite.seed import seed_model
+from .test_base import TestBase
+
+APP_INIT = '''
+import enum
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+
+class Plan(enum.Enum):
+    free = 1
+    paid = 2
+
+class Author(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    handle = db.Column(db.String(12), unique=True, nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    active = db.Column(db.Boolean, nullable=False)
+    score = db.Column(db.Float)
+    balance = db.Column(db.Numeric(8, 2))
+    born = db.Column(db.Date)
+    joined = db.Column(db.DateTime, nullable=False)
+    plan = db.Column(db.Enum(Plan), nullable=False)
+    settings = db.Column(db.JSON)
+    token = db.Column(db.Uuid, nullable=False)
+    bio = db.Column(db.Text)
+    avatar = db.Column(db.LargeBinary, nullable=False)
+
+class Post(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    author_id = db.Column(db.ForeignKey('author.id'), nullable=False)
+    title = db.Column(db.String(80), nullable=False)
+
+def create_app(config_class):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    db.init_app(app)
+    return app
+'''
+
+CONFIG = '''
+import os
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app.db')
+'''
+
+class TestSeed(TestBase):
+    """Test rows are made up from the column types and loaded"""
+
+    def _project(self):
+        os.makedirs('app')
+        with open(os.path.join('app', '__init__.py'), 'w', encoding='utf-8') as f:
+            f.write(APP_INIT)
+        with open('config.py', 'w', encoding='utf-8') as f:
+            f.write(CONFIG)
+
+    def _rows(self, table, path='app.db'):
+        with closing(sqlite3.connect(path)) as connection:
+            return connection.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+
+    def test_seed_every_type(self, capfd):
+        """Test all the columns get values and the table is loaded in batches"""
+        self._project()
+        report = seed_model(sys.executable, 'Author', 250, batch_size=100)
+
+        assert report == dict(report, model='Author', table='author', database='sqlite', existing=0, rows=250)
+        assert report['method'] == 'executemany in one transaction'
+        assert '100/250 rows (40%)' in capfd.readouterr().out
+
+        rows = self._rows('author')
+        assert len(rows) == 250
+        assert len({row[1] for row in rows}) == 250
+        assert all(len(row[1]) <= 12 for row in rows)
+        assert all(row[2].endswith('@example.com') for row in rows)
+        assert {row[8] for row in rows} == {'free', 'paid'}
+        assert all(isinstance(row[12], bytes) and len(row[12]) == 16 for row in rows)
+        # Nullable columns get some NULLs, the others none
+        assert any(row[11] is None for row in rows)
+        assert all(row[column] is not None for row in rows for column in (1, 2, 3, 7, 8, 10))
+        with closing(sqlite3.connect('app.db')) as connection:
+            assert connection.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+
+    def test_seed_foreign_keys(self):
+        """Test references point at existing rows, and need them"""
+        self._project()
+        with pytest.raises(RuntimeError, match='author is empty, seed it first'):
+            seed_model(sys.executable, 'Post', 10)
+
+        seed_model(sys.executable, 'Author', 20)
+        report = seed_model(sys.executable, 'post', 300)
+        assert report['model'] == 'Post'
+
+        author_ids = {row[0] for row in self._rows('author')}
+        posts = self._rows('post')
+        assert len(posts) == 300
+        assert {post[1] for post in posts} <= author_ids
+        assert len({post[1] for post in posts}) > 10
+
+    def test_seed_is_deterministic(self):
+        """Test the same seed gives the same rows and more rows continue the numbering"""
+        self._project()
+        urls = {name: f'sqlite:///{os.path.abspath(name)}.db' for name in ('first', 'second', 'third')}
+        for name, seed in (('first', 7), ('second', 7), ('third', 8)):
+            seed_model(sys.executable, 'Author', 50, seed=seed, database_url=urls[name])
+        assert self._rows('author', 'first.db') == self._rows('author', 'second.db')
+        assert self._rows('author', 'first.db') != self._rows('author', 'third.db')
+
+        # Unique values don't collide with the rows already there
+        report = seed_model(sys.executable, 'Author', 50, seed=7, database_url=urls['first'])
+        assert report['existing'] == 50
+        assert len({row[1] for row in self._rows('author', 'first.db')}) == 100
+
+    def test_seed_unknown_model(self):
+        """Test the models are listed when the name matches none"""
+        self._project()
+        with pytest.raises(RuntimeError, match='No model called Comment, the models are Author, Post'):
+            seed_model(sys.executable, 'Comment', 10)
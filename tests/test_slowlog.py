@@ -0,0 +1,66 @@
+"""
+Tests for slow-query log summaries
+"""
+import json
+import os
+from flite.slowlog import aggregate_slowlog, normalize_statement, read_slowlog, slowlog_files
+from .test_base import TestBase
+
+def _record(ms, statement, route='GET /api/examples/<int:example_id>', plan=None):
+    return {'ts': '2026-01-01T00:00:00.000+00:00', 'ms': ms, 'statement': statement, 'params': ['int'], 'route': route, 'plan': plan}
+
+class TestSlowlog(TestBase):
+    """Test slow-query log aggregation"""
+    
+    def test_normalize_statement(self):
+        """Test literals, placeholder styles and IN lists normalize alike"""
+        assert normalize_statement("SELECT * FROM t\n WHERE id = 5 AND name = 'it''s'") == 'SELECT * FROM t WHERE id = ? AND name = ?'
+        assert normalize_statement('SELECT * FROM t WHERE id = %(id_1)s') == normalize_statement('SELECT * FROM t WHERE id = :id')
+        assert normalize_statement('SELECT * FROM t WHERE id IN (?, ?, ?)') == normalize_statement('SELECT * FROM t WHERE id IN ($1, $2)')
+        assert normalize_statement('SELECT x::text FROM t1') == 'SELECT x::text FROM t1'
+    
+    def test_aggregate_slowlog(self):
+        """Test records group by normalized statement, heaviest first"""
+        records = [
+            _record(120.0, 'SELECT * FROM t WHERE id = ?', plan=['SCAN t']),
+            _record(300.0, 'SELECT * FROM t WHERE id = 7', plan=['SEARCH t']),
+            _record(150.0, 'SELECT * FROM u', route=None),
+        ]
+        summary = aggregate_slowlog(records)
+        
+        assert [group['count'] for group in summary] == [2, 1]
+        assert summary[0]['total_ms'] == 420.0
+        assert summary[0]['max_ms'] == 300.0
+        # The plan of the slowest run
+        assert summary[0]['plan'] == ['SEARCH t']
+        assert summary[1]['routes'] == [('(outside a request)', 1)]
+        assert aggregate_slowlog(records, sort='max')[0]['statement'] == 'SELECT * FROM t WHERE id = ?'
+        assert aggregate_slowlog(records, sort='mean')[0]['statement'] == 'SELECT * FROM t WHERE id = ?'
+    
+    def test_read_rotated_files(self):
+        """Test rotated backups are read oldest first and broken lines skipped"""
+        os.makedirs('instance')
+        path = os.path.join('instance', 'slow_queries.ndjson')
+        for name, ms in ((f'{path}.2', 1.0), (f'{path}.1', 2.0), (path, 3.0)):
+            with open(name, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(_record(ms, 'SELECT 1')) + '\n{"ms": 4, "statem\n')
+        
+        paths = slowlog_files(path)
+        
+        assert paths == [f'{path}.2', f'{path}.1', path]
+        assert [record['ms'] for record in read_slowlog(paths)] == [1.0, 2.0, 3.0]
+        assert slowlog_files(os.path.join('instance', 'missing.ndjson')) == []
+    
+    def test_read_per_process_files(self):
+        """Test the file of every process is read, with its own backups"""
+        os.makedirs('instance')
+        path = os.path.join('instance', 'slow_queries.ndjson')
+        for name in ('slow_queries.101.ndjson', 'slow_queries.101.ndjson.1', 'slow_queries.202.ndjson', 'slow_queries.x.ndjson', 'other.101.ndjson'):
+            with open(os.path.join('instance', name), 'w', encoding='utf-8') as f:
+                f.write(json.dumps(_record(1.0, 'SELECT 1')) + '\n')
+        
+        assert slowlog_files(path) == [
+            os.path.join('instance', 'slow_queries.101.ndjson.1'),
+            os.path.join('instance', 'slow_queries.101.ndjson'),
+            os.path.join('instance', 'slow_queries.202.ndjson')
+        ]
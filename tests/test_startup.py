@@ -0,0 +1,56 @@
+"""
+Tests for startup profiling
+"""
+import pytest
+import sys
+from flite.generator import ProjectGenerator
+from flite.startup import parse_importtime, slowest_imports, startup_report
+from .test_base import TestBase
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     flask.json.tag
+import time:      2000 |       5000 |   flask.app
+import time:       300 |       5300 | flask
+import time:      4000 |       4000 | app.routes
+import time:       700 |      10000 | app
+Traceback (most recent call last):
+"""
+
+class TestStartup(TestBase):
+    """Test startup reports"""
+    
+    def test_parse_importtime(self):
+        """Test -X importtime lines are parsed and other lines ignored"""
+        imports = parse_importtime(IMPORTTIME_OUTPUT)
+        
+        assert imports[0] == ('flask.json.tag', 120, 120, 2)
+        assert imports[2] == ('flask', 300, 5300, 0)
+        assert len(imports) == 5
+    
+    def test_slowest_imports(self):
+        """Test packages rank by cumulative time, modules by their own time"""
+        by_package, by_module = slowest_imports(parse_importtime(IMPORTTIME_OUTPUT), top=2)
+        
+        # The project's package is the total, it is not ranked
+        assert by_package == [('flask', 5300)]
+        assert by_module == [('app.routes', 4000), ('flask.app', 2000)]
+    
+    def test_startup_report(self):
+        """Test a generated app is started and its create_app steps timed"""
+        generator = ProjectGenerator()
+        generator._create_directory_structure()
+        generator._generate_files('test_startup', 'basic', 'none', False, False, 'none')
+        
+        report = startup_report(sys.executable)
+        
+        assert report['first_status'] == 200
+        assert report['process'] >= report['import_app'] + report['create_app']
+        assert any(name == 'flask' for name, self_us, cumulative_us, depth in report['imports'])
+        sources = [step['source'] for step in report['steps']]
+        assert 'app.register_blueprint(main_bp)' in sources
+        assert all(step['location'].startswith('app') for step in report['steps'])
+    
+    def test_startup_report_without_app(self):
+        """Test a project that can't start is reported as an error"""
+        with pytest.raises(RuntimeError):
+            startup_report(sys.executable)